@@ -0,0 +1,267 @@
+"""
+Headless benchmarks for the physics, collision, loading and rendering hot paths.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json --threshold 0.1
+
+Runs against data/maps/map_01.tmx plus synthetic maps of increasing size, prints
+a JSON report and, with --baseline, exits non zero when a metric regressed.
+"""
+import argparse
+import gc
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).absolute().parents[1]
+sys.path.insert(0, str(ROOT_PATH))
+
+import pygame
+
+from benchmarks.synthetic_map import generate_map
+from src import Game
+from src.components import (
+    Character,
+    Map
+)
+from src.components.map_cache import MapCache
+from src.enums import CharacterName
+from src.utils import Utils
+
+
+# (name, width in tiles, height in tiles, entities per tile)
+SYNTHETIC_MAPS = [
+    ('synthetic_small', 64, 18, 0.02),
+    ('synthetic_medium', 256, 36, 0.02),
+    ('synthetic_large', 1024, 64, 0.02),
+]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Percentiles in milliseconds of samples given in seconds"""
+    ordered = sorted(samples)
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+    return {
+        'mean': sum(ordered) / len(ordered) * 1000,
+        'p50': percentile(0.5),
+        'p90': percentile(0.9),
+        'p99': percentile(0.99),
+        'max': ordered[-1] * 1000,
+    }
+
+
+def scripted_events(tick: int) -> list[pygame.event.Event]:
+    """Run back and forth and jump regularly so collision and contact paths stay busy"""
+    events = []
+    if tick % 600 == 0:
+        key_up, key_down = (pygame.K_a, pygame.K_d) if tick // 600 % 2 == 0 else (pygame.K_d, pygame.K_a)
+        events.append(pygame.event.Event(pygame.KEYUP, key=key_up))
+        events.append(pygame.event.Event(pygame.KEYDOWN, key=key_down))
+    if tick % 90 == 45:
+        events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_w))
+    return events
+
+
+def bench_setup(game: Game, map_path: Path, runs: int) -> dict[str, float]:
+    game_map = game.map
+    results = {}
+    for label, use_map_cache in (('pytmx', False), ('cache', True)):
+        Map.use_map_cache = use_map_cache
+        # The first load compiles the cache, so it is not timed
+        game_map.setup(map_path, game_map.player, game_map.background)
+        start = time.perf_counter()
+        for _ in range(runs):
+            game_map.setup(map_path, game_map.player, game_map.background)
+        results[f'setup_{label}_per_s'] = runs / (time.perf_counter() - start)
+    Map.use_map_cache = True
+    return results
+
+
+# Map methods whose time Map.update spends in player collision and contact
+COLLISION_METHODS = ('handle_player_tile_collision', 'handle_player_contact')
+
+
+def time_methods(target: object, names: tuple[str, ...]) -> list[float]:
+    """
+    Shadow the named methods of target with timed wrappers, their total time in
+    seconds accumulates in the returned one item list until untime_methods
+    """
+    elapsed = [0.0]
+    clock = time.perf_counter
+    for name in names:
+        def timed(*args, method=getattr(target, name), **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed[0] += clock() - start
+        setattr(target, name, timed)
+    return elapsed
+
+
+def untime_methods(target: object, names: tuple[str, ...]) -> None:
+    for name in names:
+        delattr(target, name)
+    return None
+
+
+def bench_frames(game: Game, map_path: Path, frames: int) -> dict[str, dict]:
+    game_map = game.map
+    game_map.setup(map_path, game_map.player, game_map.background)
+    update_samples, draw_samples, collision_samples = [], [], []
+    clock = time.perf_counter
+    # Time the collision and contact calls Map.update makes, rather than running them twice
+    collision_time = time_methods(game_map, COLLISION_METHODS)
+    try:
+        for tick in range(frames):
+            for event in scripted_events(tick):
+                game_map.handle_input_event(event)
+            collision_time[0] = 0.0
+            start = clock()
+            game_map.update(game.fixed_dt)
+            update_samples.append(clock() - start)
+            collision_samples.append(collision_time[0])
+            start = clock()
+            game_map.draw(game.screen)
+            draw_samples.append(clock() - start)
+    finally:
+        untime_methods(game_map, COLLISION_METHODS)
+    return {
+        'update_ms': summarize(update_samples),
+        'collision_ms': summarize(collision_samples),
+        'draw_ms': summarize(draw_samples),
+        'blits_per_frame': game_map.render_queue.blit_count,
+    }
+
+
+def bench_memory(game: Game, map_path: Path, frames: int) -> dict[str, float]:
+    game_map = game.map
+    gc.collect()
+    tracemalloc.start()
+    game_map.setup(map_path, game_map.player, game_map.background)
+    for tick in range(frames):
+        for event in scripted_events(tick):
+            game_map.handle_input_event(event)
+        game_map.update(game.fixed_dt)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'python_peak_kb': peak / 1024}
+
+
+def bench_spritesheets(runs: int) -> dict[str, float]:
+    results = {}
+    for label, clear in (('cold', True), ('warm', False)):
+        start = time.perf_counter()
+        for _ in range(runs):
+            if clear:
+                Utils.clear_spritesheet_cache()
+            for character_name in CharacterName:
+                images = Character.load_images(ROOT_PATH, character_name)
+                images.load_all(list(images))
+        results[f'character_sheets_{label}_per_s'] = runs * len(CharacterName) / (time.perf_counter() - start)
+    return results
+
+
+def generate_maps(directory: Path, include_large: bool) -> list[tuple[str, Path]]:
+    maps = []
+    for name, width, height, density in SYNTHETIC_MAPS:
+        if name == 'synthetic_large' and not include_large:
+            continue
+        maps.append((name, generate_map(directory / f'{name}.tmx', width, height, density)))
+    return maps
+
+
+def run(frames: int, setup_runs: int, include_large: bool) -> dict:
+    game = Game(headless=True, seed=0)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'machine': platform.machine(),
+            'frames': frames,
+        },
+        'spritesheets': bench_spritesheets(max(1, setup_runs // 2)),
+        'maps': {},
+    }
+    maps = [('map_01', ROOT_PATH / game.start_map)]
+    cache_dir = MapCache.cache_dir
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Compiled maps are keyed by source path, the temporary maps would pile up in the project cache
+        MapCache.cache_dir = str(Path(temp_dir) / 'cache')
+        try:
+            maps += generate_maps(Path(temp_dir), include_large)
+            for name, map_path in maps:
+                results = bench_setup(game, map_path, setup_runs)
+                results |= bench_frames(game, map_path, frames)
+                results |= bench_memory(game, map_path, min(frames, 240))
+                results['tiles'] = len(game.map.tile_store)
+                results['items'] = len(game.map.items)
+                report['maps'][name] = results
+        finally:
+            MapCache.cache_dir = cache_dir
+    report['meta']['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+
+def flatten(report: dict, prefix: str = '') -> dict[str, float]:
+    values = {}
+    for key, value in report.items():
+        if key == 'meta':
+            continue
+        if isinstance(value, dict):
+            values |= flatten(value, f'{prefix}{key}.')
+        elif isinstance(value, (int, float)):
+            values[f'{prefix}{key}'] = value
+    return values
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Metrics worse than the baseline by more than threshold, as readable lines"""
+    current, previous = flatten(report), flatten(baseline)
+    regressions = []
+    for key, value in current.items():
+        if key not in previous or not previous[key]:
+            continue
+        ratio = value / previous[key]
+        higher_is_better = key.endswith('_per_s')
+        # Only timings, throughputs and memory are compared, counts and single worst frames are informational
+        if not (higher_is_better or '_ms.' in key or key.endswith('_kb')) or key.endswith('.max'):
+            continue
+        change = 1 / ratio - 1 if higher_is_better else ratio - 1
+        if change > threshold:
+            regressions.append(f'{key}: {previous[key]:.3f} -> {value:.3f} ({change:+.0%})')
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=1200, help='ticks simulated and drawn per map')
+    parser.add_argument('--setup-runs', type=int, default=10, help='Map.setup calls timed per map')
+    parser.add_argument('--skip-large', action='store_true', help='skip the largest synthetic map')
+    parser.add_argument('--output', type=Path, help='write the JSON report here')
+    parser.add_argument('--baseline', type=Path, help='JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative regression')
+    args = parser.parse_args()
+
+    report = run(args.frames, args.setup_runs, not args.skip_large)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + '\n')
+    print(text)
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.threshold)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
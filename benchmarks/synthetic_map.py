@@ -0,0 +1,104 @@
+import os
+import random
+
+from pathlib import Path
+
+from src.enums import EnemyName
+
+
+ROOT_PATH = Path(__file__).absolute().parents[1]
+TILESETS = [
+    (1, 'terrain'),
+    (243, 'character'),
+    (244, 'fruit'),
+    (261, 'falling_platform'),
+    (262, 'checkpoint'),
+    (263, 'static_platform'),
+]
+TERRAIN_GID = 4
+PLATFORM_GID = 263
+
+
+def generate_map(path: Path, width: int, height: int, entity_density: float = 0.02, seed: int = 0) -> Path:
+    """
+    Write a playable TMX map using the project's tilesets: a floor, walls, scattered
+    terrain ledges, slidable columns and static platforms, plus fruits and falling
+    platforms proportional to the map area, and enemies patrolling the floor.
+    """
+    assert width >= 8 and height >= 8
+    rng = random.Random(seed)
+    terrain = [[0] * width for _ in range(height)]
+    slidable = [[0] * width for _ in range(height)]
+    platform = [[0] * width for _ in range(height)]
+    for x in range(width):
+        terrain[height - 1][x] = terrain[height - 2][x] = TERRAIN_GID
+    for y in range(height):
+        terrain[y][0] = terrain[y][width - 1] = TERRAIN_GID
+    for _ in range(width * height // 40):
+        x, y = rng.randrange(2, width - 6), rng.randrange(3, height - 4)
+        for dx in range(rng.randrange(1, 5)):
+            terrain[y][x + dx] = TERRAIN_GID
+    for _ in range(max(1, width // 10)):
+        x, y = rng.randrange(2, width - 2), rng.randrange(3, height - 6)
+        for dy in range(4):
+            if not terrain[y + dy][x]:
+                slidable[y + dy][x] = TERRAIN_GID
+    for _ in range(max(1, width // 5)):
+        x, y = rng.randrange(2, width - 5), rng.randrange(3, height - 4)
+        for dx in range(3):
+            if not terrain[y][x + dx] and not slidable[y][x + dx]:
+                platform[y][x + dx] = PLATFORM_GID
+
+    entities = max(1, int(width * height * entity_density))
+    pixel_width, pixel_height = width * 32, height * 32
+    objects = [
+        ' <objectgroup id="1" name="character">',
+        f'  <object id="1" gid="243" x="78" y="{(height - 2) * 32}" width="64" height="64"/>',
+        ' </objectgroup>',
+        ' <objectgroup id="2" name="fruit">',
+    ]
+    object_id = 2
+    for _ in range(entities):
+        x, y = rng.randrange(64, pixel_width - 96), rng.randrange(128, pixel_height - 64)
+        objects.append(f'  <object id="{object_id}" gid="244" x="{x}" y="{y}" width="64" height="64"/>')
+        object_id += 1
+    objects += [' </objectgroup>', ' <objectgroup id="3" name="falling_platform">']
+    for _ in range(max(1, entities // 4)):
+        x, y = rng.randrange(64, pixel_width - 128), rng.randrange(128, pixel_height - 96)
+        objects.append(f'  <object id="{object_id}" gid="261" x="{x}" y="{y}" width="64" height="20"/>')
+        object_id += 1
+    objects += [' </objectgroup>', ' <objectgroup id="4" name="enemy">']
+    enemy_names = [enemy_name.value for enemy_name in EnemyName]
+    for _ in range(max(1, entities // 2)):
+        x = rng.randrange(64, pixel_width - 96)
+        objects.append(
+            f'  <object id="{object_id}" name="{rng.choice(enemy_names)}" x="{x}" y="{(height - 3) * 32}" '
+            f'width="32" height="32"/>'
+        )
+        object_id += 1
+    objects.append(' </objectgroup>')
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tileset_dir = os.path.relpath(ROOT_PATH / 'data/tilesets', path.parent)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<map version="1.10" tiledversion="1.11.0" orientation="orthogonal" renderorder="right-down" '
+        f'width="{width}" height="{height}" tilewidth="32" tileheight="32" infinite="0" '
+        f'nextlayerid="7" nextobjectid="{object_id}">',
+    ]
+    lines += [
+        f' <tileset firstgid="{firstgid}" source="{tileset_dir}/{name}.tsx"/>' for firstgid, name in TILESETS
+    ]
+    lines += objects
+    for layer_id, (name, grid) in enumerate(
+        [('static_platform', platform), ('terrain', terrain), ('slidable_terrain', slidable)], start=4
+    ):
+        lines.append(f' <layer id="{layer_id}" name="{name}" width="{width}" height="{height}">')
+        lines.append('  <data encoding="csv">')
+        lines.append(',\n'.join(','.join(map(str, row)) for row in grid))
+        lines.append('</data>')
+        lines.append(' </layer>')
+    lines.append('</map>')
+    path.write_text('\n'.join(lines) + '\n')
+    return path
@@ -1,3 +1,4 @@
+import argparse
 import sys
 
 from pathlib import Path
@@ -13,7 +14,21 @@ class PythonPath():
     def __exit__(self, exc_type, exc_value, traceback):
         sys.path.remove(self.path)
 
+parser = argparse.ArgumentParser(description='Pixel adventure')
+mode = parser.add_mutually_exclusive_group()
+mode.add_argument('--record', type=Path, metavar='PATH', help='record the inputs of this session to PATH')
+mode.add_argument('--replay', type=Path, metavar='PATH', help='watch a recording made with --record')
+args = parser.parse_args()
+
 with PythonPath(Path(__file__).absolute().parents[1]):
     from src import Game
-    game = Game()
+    from src.replay import ReplayDriver
+    if args.replay is not None:
+        driver = ReplayDriver.load(args.replay)
+        game = driver.create_game(headless=False)
+        game.start_replay(driver)
+    else:
+        game = Game()
+        if args.record is not None:
+            game.start_recording(args.record)
     game.run()
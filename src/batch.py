@@ -0,0 +1,231 @@
+"""
+Headless batch validation of levels across a process pool.
+
+    python -m src.batch data/maps/*.tmx --strategy random --runs 16 --ticks 7200
+    python -m src.batch data/maps/*.tmx --script recording.chrp --output report.json
+
+Every map is played by each strategy run (or input script) and reports how many
+fruits were collected, how much of the open space the player reached, and how
+high the jumps went. Workers keep the game and the parsed maps loaded between jobs.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed
+)
+from pathlib import Path
+
+import pygame
+
+from .components import Character
+from .enums import Direction
+from .replay import ReplayDriver
+
+
+class BatchWorker:
+    """Runs jobs inside one worker process, keeps the game and map data between them"""
+
+    # Ticks between two decisions of the random strategy
+    decision_interval = 30
+    jump_chance = 0.4
+    # The sweep strategy runs one way, then turns back
+    sweep_turn = 1800
+    sweep_jump_interval = 45
+
+    def __init__(self) -> None:
+        from .game import Game
+        self.game = Game(headless=True, seed=0)
+        # map path -> (map data, number of cells without terrain)
+        self.map_data = {}
+        return None
+
+    def load_map_data(self, map_path: str) -> tuple:
+        if map_path not in self.map_data:
+            map_data = self.game.map.load_map_data(self.game.root_path / map_path)
+            self.map_data[map_path] = (map_data, open_cells(map_data))
+        return self.map_data[map_path]
+
+    def random_events(self, rng: random.Random, tick: int, held: list) -> list[pygame.event.Event]:
+        if tick % self.decision_interval:
+            return []
+        events = [pygame.event.Event(pygame.KEYUP, key=key) for key in held]
+        held.clear()
+        key = rng.choice((pygame.K_a, pygame.K_d, pygame.K_d, None))
+        if key is not None:
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+            held.append(key)
+        if rng.random() < self.jump_chance:
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_w))
+        return events
+
+    def sweep_events(self, tick: int) -> list[pygame.event.Event]:
+        events = []
+        if tick % self.sweep_turn == 0:
+            key_up, key_down = (pygame.K_a, pygame.K_d) if tick // self.sweep_turn % 2 == 0 else (pygame.K_d, pygame.K_a)
+            events.append(pygame.event.Event(pygame.KEYUP, key=key_up))
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=key_down))
+        if tick % self.sweep_jump_interval == self.sweep_jump_interval // 2:
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_w))
+        return events
+
+    def run(self, job: dict) -> dict:
+        start = time.perf_counter()
+        game_map = self.game.map
+        map_data, map_open_cells = self.load_map_data(job['map'])
+        rng = random.Random(job['seed'])
+        # A fresh character per job, the decoded animations are shared
+        player = Character(game_map.player.images)
+        game_map.populate(map_data, game_map.background, rng)
+        game_map.enter(player)
+        script = ReplayDriver.load(Path(job['script'])).events if job.get('script') else None
+
+        tilewidth, tileheight = map_data.tilewidth, map_data.tileheight
+        fruits = len(game_map.items)
+        visited = set()
+        held = []
+        takeoff = peak_jump = None
+        completed_tick = None
+        ticks = 0
+        dt = self.game.fixed_dt
+        for tick in range(job['ticks']):
+            if script is not None:
+                events = script.get(tick, ())
+            elif job['strategy'] == 'sweep':
+                events = self.sweep_events(tick)
+            else:
+                events = self.random_events(rng, tick, held)
+            for event in events:
+                game_map.handle_input_event(event)
+            game_map.update(dt)
+            ticks += 1
+
+            x, y = player.hitbox.center
+            visited.add((int(x // tilewidth), int(y // tileheight)))
+            # Jump height from the last ground contact to the apex
+            bottom = player.hitbox.bottom
+            if player.contact_checker[Direction.Bottom]:
+                takeoff = bottom
+            elif takeoff is not None:
+                peak_jump = max(peak_jump or 0, takeoff - bottom)
+            if completed_tick is None and not any(not fruit.collected for fruit in game_map.items):
+                completed_tick = ticks
+                if job.get('stop_on_completion', True):
+                    break
+
+        remaining = sum(not fruit.collected for fruit in game_map.items)
+        return {
+            'map': job['map'],
+            'strategy': 'script' if script is not None else job['strategy'],
+            'seed': job['seed'],
+            'ticks': ticks,
+            'fruits': fruits,
+            'collected': fruits - remaining,
+            'completed': remaining == 0,
+            'completed_tick': completed_tick,
+            'visited_cells': sorted(visited),
+            'open_cells': map_open_cells,
+            'peak_jump_height': peak_jump or 0,
+            'seconds': time.perf_counter() - start,
+            'worker': os.getpid(),
+        }
+
+
+worker = None
+
+
+def init_worker() -> None:
+    global worker
+    worker = BatchWorker()
+    return None
+
+
+def run_job(job: dict) -> dict:
+    return worker.run(job)
+
+
+def open_cells(map_data) -> int:
+    solid = set()
+    for layer in map_data.layers:
+        if 'terrain' in layer.name:
+            solid.update((x, y) for x, y, _ in layer.tiles())
+    return map_data.width * map_data.height - len(solid)
+
+
+def summarize(results: list[dict]) -> dict:
+    """Per map totals, coverage is the union of cells reached by all runs"""
+    summary = {}
+    for result in results:
+        entry = summary.setdefault(result['map'], {
+            'runs': 0, 'completed_runs': 0, 'fruits': result['fruits'], 'best_collected': 0,
+            'fastest_completion_tick': None, 'peak_jump_height': 0, 'visited': set(),
+            'open_cells': result['open_cells'],
+        })
+        entry['runs'] += 1
+        entry['completed_runs'] += result['completed']
+        entry['best_collected'] = max(entry['best_collected'], result['collected'])
+        if result['completed_tick'] is not None:
+            fastest = entry['fastest_completion_tick']
+            entry['fastest_completion_tick'] = min(fastest or result['completed_tick'], result['completed_tick'])
+        entry['peak_jump_height'] = max(entry['peak_jump_height'], result['peak_jump_height'])
+        entry['visited'].update(map(tuple, result['visited_cells']))
+    for entry in summary.values():
+        visited = entry.pop('visited')
+        entry['coverage'] = len(visited) / max(1, entry.pop('open_cells'))
+        entry['all_fruits_reachable'] = entry['best_collected'] == entry['fruits']
+    return summary
+
+
+def run_batch(jobs: list[dict], workers: int | None = None) -> list[dict]:
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [executor.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('maps', nargs='+', help='.tmx maps, relative to the project root or absolute')
+    parser.add_argument('--strategy', choices=('random', 'sweep'), default='random')
+    parser.add_argument('--script', type=Path, action='append', default=[], help='input recording to play on every map')
+    parser.add_argument('--runs', type=int, default=8, help='strategy runs per map, each with its own seed')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first run')
+    parser.add_argument('--ticks', type=int, default=7200, help='ticks simulated per run at most')
+    parser.add_argument('--workers', type=int, help='worker processes, all cores by default')
+    parser.add_argument('--output', type=Path, help='write the JSON report here')
+    args = parser.parse_args()
+    if args.ticks < 1:
+        parser.error('--ticks must be at least 1')
+
+    jobs = []
+    for map_path in args.maps:
+        for script in args.script:
+            jobs.append({'map': map_path, 'strategy': 'script', 'script': str(script), 'seed': args.seed, 'ticks': args.ticks})
+        if not args.script:
+            for run in range(args.runs):
+                jobs.append({'map': map_path, 'strategy': args.strategy, 'seed': args.seed + run, 'ticks': args.ticks})
+
+    start = time.perf_counter()
+    results = run_batch(jobs, args.workers)
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda result: (result['map'], result['seed']))
+    summary = summarize(results)
+    report = {'jobs': len(jobs), 'seconds': elapsed, 'maps': summary}
+    if args.output:
+        for result in results:
+            result.pop('visited_cells')
+        args.output.write_text(json.dumps(report | {'runs': results}, indent=2) + '\n')
+    print(json.dumps(report, indent=2))
+    # Non zero when a level can't be completed, so pipelines can gate on it
+    return 0 if all(entry['all_fruits_reachable'] for entry in summary.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import struct
+
+from typing import Callable, Hashable
+
+import pygame
+
+
+class AnimationClip:
+
+    def __init__(self, frames: list[pygame.Surface], speed: float) -> None:
+        self.frames = frames
+        # Frames per second
+        self.speed = speed
+        # Frames played since the clip was added, shared by every subscriber
+        self.position = 0.0
+        # phase -> [frame index shown, subscribed sprites]
+        self.loops = {}
+        # sprite -> [start position, frame index shown, called once played through]
+        self.one_shots = {}
+        return None
+
+    def get_index(self, phase: float) -> int:
+        return int(self.position + phase) % len(self.frames)
+
+
+class AnimationClock:
+    """
+    Advances named clips once per tick for every sprite playing them. Looping
+    sprites are grouped by phase offset and a group is only touched when its
+    frame index changes, one-shot sprites play a clip once from its first frame.
+    A sprite plays one clip at a time, subscribing again replaces it.
+    """
+
+    snapshot_format = struct.Struct('<d')
+
+    def __init__(self) -> None:
+        self.clips = {}
+        # sprite -> (clip, phase), phase is None for one-shots
+        self.subscriptions = {}
+        return None
+
+    def add_clip(self, name: Hashable, frames: list[pygame.Surface], speed: float) -> None:
+        if name not in self.clips:
+            self.clips[name] = AnimationClip(frames, speed)
+        return None
+
+    def clear(self) -> None:
+        self.clips.clear()
+        self.subscriptions.clear()
+        return None
+
+    def subscribe(self, sprite: pygame.sprite.Sprite, name: Hashable, phase: float = 0) -> None:
+        """Loop the clip on sprite, phase is in frames"""
+        self.unsubscribe(sprite)
+        clip = self.clips[name]
+        group = clip.loops.get(phase)
+        if group is None:
+            group = clip.loops[phase] = [clip.get_index(phase), set()]
+        group[1].add(sprite)
+        sprite.image = clip.frames[group[0]]
+        self.subscriptions[sprite] = (clip, phase)
+        return None
+
+    def play(self,
+            sprite: pygame.sprite.Sprite, name: Hashable,
+            on_end: Callable[[], None] | None = None, elapsed: float = 0
+        ) -> None:
+        """Play the clip once, elapsed frames in. The last frame stays up if there is no on_end"""
+        self.unsubscribe(sprite)
+        clip = self.clips[name]
+        index = min(int(elapsed), len(clip.frames) - 1)
+        clip.one_shots[sprite] = [clip.position - elapsed, index, on_end]
+        sprite.image = clip.frames[index]
+        self.subscriptions[sprite] = (clip, None)
+        return None
+
+    def unsubscribe(self, sprite: pygame.sprite.Sprite) -> None:
+        subscription = self.subscriptions.pop(sprite, None)
+        if subscription is None:
+            return None
+        clip, phase = subscription
+        if phase is None:
+            del clip.one_shots[sprite]
+            return None
+        sprites = clip.loops[phase][1]
+        sprites.discard(sprite)
+        if not sprites:
+            del clip.loops[phase]
+        return None
+
+    def get_elapsed(self, sprite: pygame.sprite.Sprite) -> float:
+        """Frames into the one-shot sprite is playing, 0 when it plays none"""
+        clip, phase = self.subscriptions.get(sprite, (None, 0))
+        if phase is not None:
+            return 0
+        return clip.position - clip.one_shots[sprite][0]
+
+    def advance(self, dt: float) -> None:
+        ended = []
+        for clip in self.clips.values():
+            clip.position += clip.speed * dt
+            frames = clip.frames
+            for phase, group in clip.loops.items():
+                index = clip.get_index(phase)
+                if index != group[0]:
+                    group[0] = index
+                    image = frames[index]
+                    for sprite in group[1]:
+                        sprite.image = image
+            for sprite, one_shot in clip.one_shots.items():
+                elapsed = clip.position - one_shot[0]
+                if elapsed >= len(frames):
+                    if one_shot[2] is not None:
+                        ended.append((sprite, one_shot[2]))
+                    continue
+                index = int(elapsed)
+                if index != one_shot[1]:
+                    one_shot[1] = index
+                    sprite.image = frames[index]
+        # Callbacks may subscribe again, so they run once every clip is done
+        for sprite, on_end in ended:
+            self.unsubscribe(sprite)
+            on_end()
+        return None
+
+    def get_snapshot_size(self) -> int:
+        return len(self.clips) * self.snapshot_format.size
+
+    def write_snapshot(self, buffer: bytearray, offset: int) -> None:
+        for clip in self.clips.values():
+            self.snapshot_format.pack_into(buffer, offset, clip.position)
+            offset += self.snapshot_format.size
+        return None
+
+    def read_snapshot(self, buffer: bytearray, offset: int) -> None:
+        """Clip positions only, owners play their one-shots again from their own snapshot"""
+        for clip in self.clips.values():
+            clip.position, = self.snapshot_format.unpack_from(buffer, offset)
+            offset += self.snapshot_format.size
+            for phase, group in clip.loops.items():
+                group[0] = clip.get_index(phase)
+                image = clip.frames[group[0]]
+                for sprite in group[1]:
+                    sprite.image = image
+        return None
@@ -0,0 +1,78 @@
+import threading
+
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Iterable
+)
+
+
+class AssetRegistry:
+    """
+    Assets are registered as loaders and decoded on first access, then kept.
+    Decoded frames live in the shared atlas, so dropping entries would free
+    nothing and they are never unloaded.
+    """
+
+    def __init__(self) -> None:
+        self.loaders = {}
+        self.entries = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+        return None
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.loaders
+
+    def __len__(self) -> int:
+        return len(self.loaders)
+
+    def __iter__(self):
+        return iter(self.loaders)
+
+    def keys(self):
+        return self.loaders.keys()
+
+    def register(self, key: Hashable, loader: Callable[[], Any]) -> None:
+        with self.lock:
+            self.loaders[key] = loader
+            self.entries.pop(key, None)
+        return None
+
+    def is_loaded(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def __getitem__(self, key: Hashable) -> Any:
+        while 1:
+            with self.lock:
+                if key in self.entries:
+                    return self.entries[key]
+                loader = self.loaders[key]
+                event = self.pending.get(key)
+                if event is None:
+                    event = self.pending[key] = threading.Event()
+                    break
+            # Another thread is decoding it, wait and look again
+            event.wait()
+        try:
+            value = loader()
+            with self.lock:
+                self.entries[key] = value
+        finally:
+            with self.lock:
+                del self.pending[key]
+            event.set()
+        return value
+
+    def preload(self, keys: Iterable[Hashable]) -> threading.Thread:
+        """Decode keys on a daemon thread so they are ready before first use"""
+        keys = [key for key in keys if key in self.loaders]
+        thread = threading.Thread(target=self.load_all, args=(keys,), daemon=True)
+        thread.start()
+        return thread
+
+    def load_all(self, keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            self[key]
+        return None
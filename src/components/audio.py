@@ -0,0 +1,131 @@
+from functools import partial
+from itertools import count
+from pathlib import Path
+
+import pygame
+
+from .assets import AssetRegistry
+from ..enums import SoundEffect
+
+
+class AudioManager:
+    """
+    Music streams from disk through pygame.mixer.music. Sound effects are decoded
+    once and played on a fixed pool of channels; when every channel is busy the
+    oldest voice of the lowest priority not above the new one is cut off, and the
+    new effect is dropped if there is none. When the mixer can't start, the game
+    runs silent and every call does nothing.
+    """
+
+    music_path = 'assets/sounds/background_sound/8bit_platformer_loop.ogg'
+    # Mixer settings, a small buffer keeps effects in sync with the frame
+    frequency = 44100
+    buffer_size = 512
+    channel_count = 8
+    # Copies of one effect playing at once, more steal the oldest of them
+    max_instances = 3
+    music_volume = 0.4
+    effect_volume = 0.6
+    music_fade_ms = 1000
+    # Higher cuts off lower, effects not listed get the default
+    priorities = {
+        SoundEffect.Win: 4,
+        SoundEffect.PlayerHit: 3,
+        SoundEffect.EnemyHit: 2,
+        SoundEffect.Jump: 2,
+        SoundEffect.FruitCollect: 1,
+    }
+    default_priority = 1
+
+    def __init__(self, root_path: Path, enabled: bool = True) -> None:
+        self.root_path = root_path
+        self.error = None
+        self.enabled = enabled and self.init_mixer()
+        self.sounds = AssetRegistry()
+        self.channels = []
+        # Per channel: (priority, start order, effect) of the last effect played on it
+        self.voices = []
+        self.sequence = count()
+        if not self.enabled:
+            return None
+        pygame.mixer.set_num_channels(self.channel_count)
+        # Sound.play() would pick channels on its own, keep them all for the pool
+        pygame.mixer.set_reserved(self.channel_count)
+        self.channels = [pygame.mixer.Channel(index) for index in range(self.channel_count)]
+        self.voices = [None] * self.channel_count
+        path = root_path / 'assets/sounds/sound_effect'
+        for effect in SoundEffect:
+            self.sounds.register(effect, partial(self.load_sound, path / f'{effect.value}.wav', self.effect_volume))
+        self.sounds.preload(SoundEffect)
+        return None
+
+    @classmethod
+    def pre_init(cls) -> None:
+        """Mixer settings, call before pygame.init()"""
+        pygame.mixer.pre_init(cls.frequency, -16, 2, cls.buffer_size)
+        return None
+
+    def init_mixer(self) -> bool:
+        if pygame.mixer.get_init() is not None:
+            return True
+        try:
+            pygame.mixer.init()
+        except pygame.error as error:
+            # No audio device or driver, play without sound
+            self.error = str(error)
+            return False
+        return True
+
+    @classmethod
+    def load_sound(cls, path: Path, volume: float) -> pygame.mixer.Sound:
+        sound = pygame.mixer.Sound(path)
+        sound.set_volume(volume)
+        return sound
+
+    def play_music(self, path: str | None = None, loops: int = -1) -> None:
+        if not self.enabled:
+            return None
+        try:
+            pygame.mixer.music.load(self.root_path / (path or self.music_path))
+        except pygame.error as error:
+            self.error = str(error)
+            return None
+        pygame.mixer.music.set_volume(self.music_volume)
+        pygame.mixer.music.play(loops, fade_ms=self.music_fade_ms)
+        return None
+
+    def stop_music(self) -> None:
+        if self.enabled:
+            pygame.mixer.music.fadeout(self.music_fade_ms)
+        return None
+
+    def find_channel(self, effect: SoundEffect, priority: int) -> int | None:
+        # Idle channels first, then the oldest of the lowest priority voices
+        idle = None
+        victim = None
+        same_effect = []
+        for index, channel in enumerate(self.channels):
+            voice = self.voices[index]
+            if not channel.get_busy():
+                if idle is None:
+                    idle = index
+                continue
+            if voice[2] == effect:
+                same_effect.append(index)
+            if voice[0] <= priority and (victim is None or voice[:2] < self.voices[victim][:2]):
+                victim = index
+        if len(same_effect) >= self.max_instances:
+            return min(same_effect, key=lambda index: self.voices[index][1])
+        return idle if idle is not None else victim
+
+    def play(self, effect: SoundEffect) -> bool:
+        """Start an effect, False when it was dropped"""
+        if not self.enabled:
+            return False
+        priority = self.priorities.get(effect, self.default_priority)
+        index = self.find_channel(effect, priority)
+        if index is None:
+            return False
+        self.channels[index].play(self.sounds[effect])
+        self.voices[index] = (priority, next(self.sequence), effect)
+        return True
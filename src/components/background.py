@@ -13,6 +13,9 @@ class Background(pygame.sprite.Sprite):
     def __init__(self, image: pygame.Surface) -> None:
         self.image = image
         self.start_position = -1
+        # Pre-tiled backdrop one tile taller than the screen, rebuilt when the screen size changes
+        self.backdrop = None
+        self.backdrop_screen_size = None
         return None
 
     @classmethod
@@ -29,13 +32,27 @@ class Background(pygame.sprite.Sprite):
             self.start_position = -1
         return None
 
+    def build_backdrop(self, screen_size: tuple[int, int]) -> pygame.Surface:
+        image_width, image_height = self.image_size
+        # Round up so the right and bottom edges are always covered
+        cols = -(-screen_size[0] // image_width)
+        rows = -(-screen_size[1] // image_height) + 1
+        backdrop = pygame.Surface((cols * image_width, rows * image_height), pygame.SRCALPHA).convert_alpha()
+        backdrop.blits([
+            (self.image, (col * image_width, row * image_height))
+            for row in range(rows) for col in range(cols)
+        ], doreturn=False)
+        return backdrop
+
+    def get_backdrop(self, screen_size: tuple[int, int]) -> pygame.Surface:
+        if self.backdrop is None or self.backdrop_screen_size != screen_size:
+            self.backdrop = self.build_backdrop(screen_size)
+            self.backdrop_screen_size = screen_size
+        return self.backdrop
+
+    def get_blits(self, screen_size: tuple[int, int]) -> list[tuple[pygame.Surface, tuple[float, float]]]:
+        return [(self.get_backdrop(tuple(screen_size)), (0, self.start_position * self.image_size[1]))]
+
     def draw(self, screen: pygame.Surface) -> None:
-        screen_width = screen.get_width()
-        screen_height = screen.get_height()
-        current_position = self.start_position * self.image_size[1]
-        cols = screen_width // self.image_size[0]
-        while current_position < screen_height:
-            for col in range(cols):
-                screen.blit(self.image, (col * self.image_size[0], current_position))
-            current_position += self.image_size[1]
+        screen.blits(self.get_blits(screen.get_size()), doreturn=False)
         return None
@@ -0,0 +1,65 @@
+import pygame
+
+
+class Camera:
+
+    # Sprites further than this from the viewport are put to sleep
+    wake_margin = 256
+
+    def __init__(self, size: tuple[int, int]) -> None:
+        self.viewport = pygame.FRect((0, 0), size)
+        self.previous_offset = pygame.Vector2()
+        self.awake_area = self.viewport.inflate(2 * self.wake_margin, 2 * self.wake_margin)
+        self.bounds = None
+        return None
+
+    @property
+    def offset(self) -> tuple[float, float]:
+        return self.viewport.topleft
+
+    def get_offset(self, alpha: float = 1) -> tuple[int, int]:
+        offset = self.previous_offset.lerp(self.viewport.topleft, alpha)
+        return (round(offset.x), round(offset.y))
+
+    def set_bounds(self, width: float, height: float) -> None:
+        self.bounds = pygame.FRect(0, 0, width, height)
+        return None
+
+    def resize(self, size: tuple[int, int]) -> None:
+        if self.viewport.size == size:
+            return None
+        center = self.viewport.center
+        self.viewport.size = size
+        self.viewport.center = center
+        self.clamp()
+        return None
+
+    def clamp(self) -> None:
+        if self.bounds is not None:
+            # Maps smaller than the screen are pinned to the top left corner
+            if self.viewport.width >= self.bounds.width:
+                self.viewport.left = self.bounds.left
+            else:
+                self.viewport.left = min(max(self.viewport.left, self.bounds.left), self.bounds.right - self.viewport.width)
+            if self.viewport.height >= self.bounds.height:
+                self.viewport.top = self.bounds.top
+            else:
+                self.viewport.top = min(max(self.viewport.top, self.bounds.top), self.bounds.bottom - self.viewport.height)
+        # Whole pixel offsets keep tiles from shimmering while scrolling
+        self.viewport.topleft = (round(self.viewport.left), round(self.viewport.top))
+        self.awake_area = self.viewport.inflate(2 * self.wake_margin, 2 * self.wake_margin)
+        return None
+
+    def follow(self, rect: pygame.FRect, snap: bool = False) -> None:
+        self.previous_offset.update(self.viewport.topleft)
+        self.viewport.center = rect.center
+        self.clamp()
+        if snap:
+            self.previous_offset.update(self.viewport.topleft)
+        return None
+
+    def is_visible(self, rect: pygame.FRect) -> bool:
+        return self.viewport.colliderect(rect)
+
+    def is_awake(self, rect: pygame.FRect) -> bool:
+        return self.awake_area.colliderect(rect)
@@ -1,7 +1,11 @@
+import struct
+
+from functools import partial
 from pathlib import Path
 
 import pygame
 
+from .assets import AssetRegistry
 from ..enums import (
     Axis,
     Direction,
@@ -27,15 +31,22 @@ class Character(pygame.sprite.Sprite):
     wall_friction = 900
     image_size = (64, 64)
     hitbox_size = (36, 50)
+    # Positions of hitbox, velocity, tracking_rect, rect and previous_position, then frame,
+    # jump counter, status and facing indices and the boolean flags
+    snapshot_format = struct.Struct('<11dibb7?')
+    statuses = list(CharacterStatus)
+    facings = list(Direction)
 
     def __init__(self,
-            images: dict[CharacterStatus: dict[Direction, list[pygame.Surface]]],
+            images: AssetRegistry,
         ) -> None:
         super().__init__()
         # Render
         self.images = images
         self.image = pygame.Surface(self.image_size)
         self.rect = self.image.get_frect()
+        # Render position at the start of the current tick, for interpolation
+        self.previous_position = pygame.Vector2()
         self.frame = 0
 
         # Collision
@@ -63,26 +74,40 @@ class Character(pygame.sprite.Sprite):
     @classmethod
     def load_images(cls,
             root_path: Path,  character_name: CharacterName
-        ) -> dict[CharacterStatus: dict[Direction, list[pygame.Surface]]]:
-        images = {
-            status: {facing: [] for facing in Direction}
-            for status in CharacterStatus
-        }
+        ) -> AssetRegistry:
+        # Each status decodes on first use, preload() warms them in the background
+        images = AssetRegistry()
         path = root_path/ f'assets/images/characters/{character_name.value}'
-        for status in images.keys():
-            status_path = path / f'{status.value}.png'
-            images[status][Direction.Right] = Utils.read_spritesheet(
-                path=status_path, width=cls.image_size[0], height=cls.image_size[1]
-            )
-            images[status][Direction.Left] = [
-                pygame.transform.flip(
-                    surface=image, flip_x=True, flip_y=False
-                ) for image in images[status][Direction.Right]
-            ]
+        for status in CharacterStatus:
+            images.register(status, partial(cls.load_status_images, path / f'{status.value}.png'))
         return images
 
+    @classmethod
+    def load_status_images(cls, status_path: Path) -> dict[Direction, list[pygame.Surface]]:
+        return {
+            Direction.Right: Utils.read_spritesheet(
+                path=status_path, width=cls.image_size[0], height=cls.image_size[1]
+            ),
+            Direction.Left: Utils.read_spritesheet(
+                path=status_path, width=cls.image_size[0], height=cls.image_size[1], flip_x=True
+            ),
+        }
+
+    def reset(self) -> None:
+        """Stand still with no key held, as a fresh character would on a new level"""
+        self.velocity.update(0, 0)
+        self.jump_counter = 0
+        self.accerleration_direction.update({Direction.Right: False, Direction.Left: False})
+        self.wall_jumping = False
+        self.skip_platform = False
+        self.status = None
+        self.facing = Direction.Right
+        self.frame = 0
+        return None
+
     def set_init_postion(self, position: tuple[float]) -> None:
         self.rect.topleft = position
+        self.previous_position.update(self.rect.topleft)
         self.hitbox.midbottom = self.rect.midbottom
         self.tracking_rect.midbottom = self.hitbox.midbottom
         self.update_collision_direction_checker_rect()
@@ -197,10 +222,11 @@ class Character(pygame.sprite.Sprite):
         return None
 
     def update_image(self, dt: float) -> None:
+        frames = self.images[self.status][self.facing]
         self.frame += self.animation_speed * dt
-        frame_index = int(self.frame) % len(self.images[self.status][self.facing])
-        self.image = self.images[self.status][self.facing][frame_index]
-        if self.frame >= len(self.images[self.status][self.facing]):
+        frame_index = int(self.frame) % len(frames)
+        self.image = frames[frame_index]
+        if self.frame >= len(frames):
             self.frame = 0
         return None
 
@@ -212,6 +238,16 @@ class Character(pygame.sprite.Sprite):
         self.update_image(dt)
         return None
 
+    def get_state(self) -> dict:
+        return {
+            'position': tuple(self.hitbox.topleft),
+            'velocity': tuple(self.velocity),
+            'status': self.status,
+            'facing': self.facing,
+            'jump_counter': self.jump_counter,
+            'contact': dict(self.contact_checker),
+        }
+
     def is_collision(self, object_rect: pygame.FRect, direction: Direction) -> bool:
         if direction == Direction.Right:
             return self.hitbox.right >= object_rect.left and self.tracking_rect.right <= object_rect.left
@@ -224,6 +260,61 @@ class Character(pygame.sprite.Sprite):
         else:
             raise ValueError(f'Invalid dicrection {direction}')
 
-    def draw(self, surface: pygame.Surface) -> None:
-        surface.blit(self.image, self.rect.topleft)
+    def write_snapshot(self, buffer: bytearray, offset: int) -> None:
+        self.snapshot_format.pack_into(
+            buffer, offset,
+            *self.hitbox.topleft, *self.velocity, *self.tracking_rect.topleft, *self.rect.topleft,
+            *self.previous_position, self.frame,
+            self.jump_counter,
+            self.statuses.index(self.status) if self.status is not None else -1,
+            self.facings.index(self.facing),
+            self.wall_jumping, self.skip_platform,
+            self.accerleration_direction[Direction.Right], self.accerleration_direction[Direction.Left],
+            self.contact_checker[Direction.Right], self.contact_checker[Direction.Left],
+            self.contact_checker[Direction.Bottom],
+        )
+        return None
+
+    def read_snapshot(self, buffer: bytearray, offset: int) -> None:
+        (
+            hitbox_x, hitbox_y, velocity_x, velocity_y, tracking_x, tracking_y, rect_x, rect_y,
+            previous_x, previous_y, self.frame, self.jump_counter, status, facing,
+            self.wall_jumping, self.skip_platform, accerleration_right, accerleration_left,
+            contact_right, contact_left, contact_bottom,
+        ) = self.snapshot_format.unpack_from(buffer, offset)
+        self.hitbox.topleft = (hitbox_x, hitbox_y)
+        self.velocity.update(velocity_x, velocity_y)
+        self.tracking_rect.topleft = (tracking_x, tracking_y)
+        self.rect.topleft = (rect_x, rect_y)
+        self.previous_position.update(previous_x, previous_y)
+        self.status = self.statuses[status] if status >= 0 else None
+        self.facing = self.facings[facing]
+        self.accerleration_direction[Direction.Right] = accerleration_right
+        self.accerleration_direction[Direction.Left] = accerleration_left
+        self.contact_checker[Direction.Right] = contact_right
+        self.contact_checker[Direction.Left] = contact_left
+        self.contact_checker[Direction.Bottom] = contact_bottom
+        self.update_collision_direction_checker_rect()
+        if self.status is not None:
+            frames = self.images[self.status][self.facing]
+            self.image = frames[int(self.frame) % len(frames)]
+        return None
+
+    def store_previous_position(self) -> None:
+        self.previous_position.update(self.rect.topleft)
+        return None
+
+    def get_render_position(self, alpha: float = 1) -> pygame.Vector2:
+        return self.previous_position.lerp(self.rect.topleft, alpha)
+
+    def get_blit(self,
+            offset: tuple[float, float] = (0, 0), alpha: float = 1
+        ) -> tuple[pygame.Surface, tuple[int, int]]:
+        position = self.get_render_position(alpha)
+        return self.image, (round(position.x - offset[0]), round(position.y - offset[1]))
+
+    def draw(self,
+            surface: pygame.Surface, offset: tuple[float, float] = (0, 0), alpha: float = 1
+        ) -> None:
+        surface.blit(*self.get_blit(offset, alpha))
         return None
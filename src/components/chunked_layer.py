@@ -0,0 +1,73 @@
+import pygame
+
+
+class ChunkedLayer:
+
+    chunk_size = (512, 512)
+
+    def __init__(self, chunk_size: tuple[int, int] | None = None) -> None:
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+        assert self.chunk_size[0] > 0
+        assert self.chunk_size[1] > 0
+        self.chunks = {}
+        return None
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def chunk_range(self, rect: pygame.Rect | pygame.FRect) -> tuple[range, range]:
+        chunk_width, chunk_height = self.chunk_size
+        return (
+            range(int(rect.left // chunk_width), int((rect.right - 1) // chunk_width) + 1),
+            range(int(rect.top // chunk_height), int((rect.bottom - 1) // chunk_height) + 1),
+        )
+
+    def get_chunk(self, key: tuple[int, int]) -> pygame.Surface:
+        if key not in self.chunks:
+            self.chunks[key] = pygame.Surface(self.chunk_size, pygame.SRCALPHA).convert_alpha()
+        return self.chunks[key]
+
+    def bake(self, blits: list[tuple[pygame.Surface, tuple[int, int]]]) -> None:
+        """Composite images at world positions into chunk surfaces, keeping their draw order"""
+        self.chunks.clear()
+        chunk_width, chunk_height = self.chunk_size
+        for image, position in blits:
+            rect = image.get_rect(topleft=position)
+            cols, rows = self.chunk_range(rect)
+            for col in cols:
+                for row in rows:
+                    self.get_chunk((col, row)).blit(image, (rect.x - col * chunk_width, rect.y - row * chunk_height))
+        return None
+
+    def bake_chunk(self, key: tuple[int, int], blits: list[tuple[pygame.Surface, tuple[int, int]]]) -> None:
+        """Rebuild a single chunk, parts of images outside of it are clipped"""
+        chunk_width, chunk_height = self.chunk_size
+        self.chunks.pop(key, None)
+        if not blits:
+            return None
+        chunk = self.get_chunk(key)
+        chunk.blits([
+            (image, (x - key[0] * chunk_width, y - key[1] * chunk_height)) for image, (x, y) in blits
+        ], doreturn=False)
+        return None
+
+    def drop_chunk(self, key: tuple[int, int]) -> None:
+        self.chunks.pop(key, None)
+        return None
+
+    def get_blits(self, view: pygame.Rect) -> list[tuple[pygame.Surface, tuple[int, int]]]:
+        chunk_width, chunk_height = self.chunk_size
+        cols, rows = self.chunk_range(view)
+        blits = []
+        for col in cols:
+            for row in rows:
+                chunk = self.chunks.get((col, row))
+                if chunk is not None:
+                    blits.append((chunk, (col * chunk_width - view.x, row * chunk_height - view.y)))
+        return blits
+
+    def draw(self, screen: pygame.Surface, offset: tuple[float, float] = (0, 0)) -> None:
+        view = pygame.Rect((int(offset[0]), int(offset[1])), screen.get_size())
+        screen.blits(self.get_blits(view), doreturn=False)
+        return None
@@ -0,0 +1,38 @@
+import pygame
+
+from .tile import TerrainBlock
+
+
+class CollisionMesh:
+
+    @classmethod
+    def merge_cells(cls, cells: set[tuple[int, int]]) -> list[tuple[int, int, int, int]]:
+        """Greedily cover solid cells with maximal (x, y, width, height) rectangles"""
+        remaining = set(cells)
+        rects = []
+        for x, y in sorted(cells, key=lambda cell: (cell[1], cell[0])):
+            if (x, y) not in remaining:
+                continue
+            width = 1
+            while (x + width, y) in remaining:
+                width += 1
+            height = 1
+            while all((col, y + height) in remaining for col in range(x, x + width)):
+                height += 1
+            for row in range(y, y + height):
+                for col in range(x, x + width):
+                    remaining.remove((col, row))
+            rects.append((x, y, width, height))
+        return rects
+
+    @classmethod
+    def build(cls,
+            solid_cells: dict[bool, set[tuple[int, int]]], tilewidth: float, tileheight: float
+        ) -> list[TerrainBlock]:
+        """solid_cells maps the slidable flag to its cells, cells with different flags never merge"""
+        blocks = []
+        for slidable, cells in solid_cells.items():
+            for x, y, width, height in cls.merge_cells(cells):
+                rect = pygame.FRect(x * tilewidth, y * tileheight, width * tilewidth, height * tileheight)
+                blocks.append(TerrainBlock(rect, slidable))
+        return blocks
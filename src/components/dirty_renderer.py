@@ -0,0 +1,70 @@
+from collections import Counter
+
+import pygame
+
+from .render_queue import RenderQueue
+from ..enums import RenderLayer
+
+
+class DirtyRectRenderer:
+    """
+    Keeps the static layers of the last frame in a cached backdrop and only repaints
+    the regions where a moving or animated entry changed since the previous frame.
+    """
+
+    static_layers = (RenderLayer.Background, RenderLayer.StaticTiles)
+
+    def __init__(self) -> None:
+        self.backdrop = None
+        self.backdrop_key = None
+        # (surface, topleft) pairs drawn in the previous frame
+        self.previous_entries = Counter()
+        return None
+
+    def invalidate(self) -> None:
+        self.backdrop_key = None
+        return None
+
+    def build_backdrop(self, screen: pygame.Surface, queue: RenderQueue) -> None:
+        if self.backdrop is None or self.backdrop.get_size() != screen.get_size():
+            self.backdrop = pygame.Surface(screen.get_size()).convert()
+        self.backdrop.fill('black')
+        for layer in self.static_layers:
+            self.backdrop.blits(queue.layers[layer], doreturn=False)
+        return None
+
+    def render(self, screen: pygame.Surface, queue: RenderQueue, key: object) -> list[pygame.Rect]:
+        """key identifies the static content, e.g. the camera offset; a new key repaints everything"""
+        entries = [
+            (surface, surface.get_rect(topleft=(int(position[0]), int(position[1]))))
+            for layer, layer_entries in queue.layers.items() if layer not in self.static_layers
+            for surface, position in layer_entries
+        ]
+        # Entries are compared as (surface, topleft) multisets, overlapping duplicates are legal
+        current = Counter((surface, rect.topleft) for surface, rect in entries)
+        screen_rect = screen.get_rect()
+
+        if key != self.backdrop_key or self.backdrop.get_size() != screen.get_size():
+            self.build_backdrop(screen, queue)
+            self.backdrop_key = key
+            screen.blit(self.backdrop, (0, 0))
+            screen.blits(entries, doreturn=False)
+            dirty_rects = [screen_rect]
+            queue.blit_count = len(entries) + 1
+        else:
+            changed = (self.previous_entries - current) + (current - self.previous_entries)
+            dirty_rects = [surface.get_rect(topleft=topleft).clip(screen_rect) for surface, topleft in changed]
+            dirty_rects = [rect for rect in dirty_rects if rect]
+            blit_count = 0
+            # Restore each region from the backdrop, then repaint everything overlapping it clipped to it
+            for dirty_rect in dirty_rects:
+                screen.set_clip(dirty_rect)
+                screen.blit(self.backdrop, dirty_rect, dirty_rect)
+                overlapping = [(surface, rect) for surface, rect in entries if rect.colliderect(dirty_rect)]
+                screen.blits(overlapping, doreturn=False)
+                blit_count += len(overlapping) + 1
+            screen.set_clip(None)
+            queue.blit_count = blit_count
+        self.previous_entries = current
+        queue.clear()
+        return dirty_rects
@@ -52,7 +52,6 @@ class Particle(pygame.sprite.Sprite):
 
     def update(self) -> None:
         self.rect.center += self.velocity
-        self.timer.update()
         if not self.timer.active:
             self.kill()
         return None
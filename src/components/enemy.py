@@ -0,0 +1,121 @@
+import struct
+
+from pathlib import Path
+
+import numpy as np
+import pygame
+
+from .physics import PhysicsBodies
+from ..enums import (
+    Direction,
+    EnemyName
+)
+from ..utils import Utils
+
+
+class Enemy:
+
+    # Constants
+    animation_speed = 20
+    walk_speed = 60
+    # The sheets differ per enemy, frames are laid out in a single row
+    frame_sizes = {
+        EnemyName.AngryPig: (36, 30),
+        EnemyName.BigRock: (38, 34),
+        EnemyName.Bunny: (34, 44),
+        EnemyName.Chameleon: (84, 38),
+        EnemyName.Chicken: (32, 34),
+        EnemyName.MediumRock: (32, 28),
+        EnemyName.Mushroom: (32, 32),
+        EnemyName.Radish: (30, 38),
+        EnemyName.Rino: (52, 34),
+        EnemyName.SmallRock: (22, 18),
+        EnemyName.Snail: (38, 24),
+        EnemyName.Trunk: (64, 32),
+    }
+    walk_animations = {
+        EnemyName.AngryPig: 'walk',
+        EnemyName.Snail: 'walk',
+    }
+
+    @classmethod
+    def load_images(cls, root_path: Path, enemy_name: EnemyName) -> dict[Direction, list[pygame.Surface]]:
+        width, height = cls.frame_sizes[enemy_name]
+        animation = cls.walk_animations.get(enemy_name, 'run')
+        path = root_path / f'assets/images/enemies/{enemy_name.value}/{animation}.png'
+        # Unlike the characters, the enemy sheets face left
+        return {
+            Direction.Left: Utils.read_spritesheet(path=path, width=width, height=height),
+            Direction.Right: Utils.read_spritesheet(path=path, width=width, height=height, flip_x=True),
+        }
+
+
+class EnemyGroup:
+    """
+    Enemies patrolling the level. Their movement is simulated by PhysicsBodies, this
+    only keeps what is needed to draw them.
+    """
+
+    # Animation time, the bodies follow
+    snapshot_format = struct.Struct('<d')
+
+    def __init__(self) -> None:
+        self.bodies = PhysicsBodies()
+        # Per body, in body order
+        self.images = []
+        self.phase = np.zeros(0)
+        self.time = 0
+        return None
+
+    def __len__(self) -> int:
+        return len(self.bodies)
+
+    def add(self,
+            enemy_name: EnemyName, images: dict[Direction, list[pygame.Surface]],
+            midbottom: tuple[float, float], phase: float = 0
+        ) -> int:
+        width, height = Enemy.frame_sizes[enemy_name]
+        index = self.bodies.add((midbottom[0] - width / 2, midbottom[1] - height), (width, height), Enemy.walk_speed)
+        self.images.append(images)
+        self.phase = np.append(self.phase, phase)
+        return index
+
+    def clear(self) -> None:
+        self.bodies.clear()
+        self.images.clear()
+        self.phase = np.zeros(0)
+        return None
+
+    def get_snapshot_size(self) -> int:
+        return self.snapshot_format.size + self.bodies.get_snapshot_size()
+
+    def write_snapshot(self, buffer: bytearray, offset: int) -> None:
+        self.snapshot_format.pack_into(buffer, offset, self.time)
+        self.bodies.write_snapshot(buffer, offset + self.snapshot_format.size)
+        return None
+
+    def read_snapshot(self, buffer: bytearray, offset: int) -> None:
+        self.time, = self.snapshot_format.unpack_from(buffer, offset)
+        self.bodies.read_snapshot(buffer, offset + self.snapshot_format.size)
+        return None
+
+    def update(self, dt: float, awake_area: pygame.Rect) -> None:
+        # Enemies far away from the viewport sleep like the sprites do
+        self.time += dt
+        if len(self.bodies):
+            self.bodies.step(dt, self.bodies.in_area(awake_area))
+        return None
+
+    def get_blits(self, view: pygame.Rect) -> list[tuple[pygame.Surface, tuple[int, int]]]:
+        bodies = self.bodies
+        if not len(bodies):
+            return []
+        visible = np.flatnonzero(bodies.in_area(view))
+        positions = (bodies.position[visible] - (view.x, view.y)).astype(np.int32).tolist()
+        facings = (bodies.direction[visible] > 0).tolist()
+        frames = (self.time * Enemy.animation_speed + self.phase[visible]).astype(np.int64).tolist()
+        blits = []
+        for index, position, facing_right, frame in zip(visible.tolist(), positions, facings, frames):
+            images = self.images[index][Direction.Right if facing_right else Direction.Left]
+            blits.append((images[frame % len(images)], position))
+        return blits
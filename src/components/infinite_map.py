@@ -0,0 +1,196 @@
+import base64
+import gzip
+import os
+import xml.etree.ElementTree as ElementTree
+import zlib
+
+from array import array
+from pathlib import Path
+
+
+class InfiniteMapReader:
+    """
+    Reads Tiled infinite maps, which pytmx does not support, into the same pieces
+    MapCache.compile writes for finite maps. Tile data is stored in chunks that
+    can lie at negative coordinates, so the whole map is shifted to start at the
+    top left chunk.
+    """
+
+    # Tiled keeps the flip flags in the high bits of each gid
+    flipped_horizontally = 0x80000000
+    flipped_vertically = 0x40000000
+    flipped_diagonally = 0x20000000
+    gid_mask = 0x0FFFFFFF
+
+    @classmethod
+    def is_infinite(cls, map_path: Path) -> bool:
+        # Only the root element is needed, stop parsing right after it
+        for _, element in ElementTree.iterparse(map_path, events=('start',)):
+            return element.get('infinite') == '1'
+        return False
+
+    @classmethod
+    def iter_layers(cls, element: ElementTree.Element):
+        # Layers in document order, group layers flattened
+        for child in element:
+            if child.tag in ('layer', 'objectgroup'):
+                yield child
+            elif child.tag == 'group':
+                yield from cls.iter_layers(child)
+
+    @classmethod
+    def decode(cls, data: ElementTree.Element, text: str) -> array:
+        encoding = data.get('encoding')
+        if encoding == 'csv':
+            return array('I', (int(value) for value in text.replace('\n', '').split(',') if value.strip()))
+        if encoding != 'base64':
+            raise ValueError(f'Unsupported tile data encoding {encoding}')
+        raw = base64.b64decode(text.strip())
+        compression = data.get('compression')
+        if compression == 'zlib':
+            raw = zlib.decompress(raw)
+        elif compression == 'gzip':
+            raw = gzip.decompress(raw)
+        elif compression:
+            raise ValueError(f'Unsupported tile data compression {compression}')
+        gids = array('I')
+        gids.frombytes(raw)
+        if gids.itemsize != 4:
+            raise ValueError('Tile data needs a 4-byte unsigned array type')
+        return gids
+
+    @classmethod
+    def read_tilesets(cls, root: ElementTree.Element, map_dir: Path) -> list[tuple[int, ElementTree.Element, Path]]:
+        tilesets = []
+        for tileset in root.iter('tileset'):
+            firstgid = int(tileset.get('firstgid'))
+            base_dir = map_dir
+            if 'source' in tileset.attrib:
+                source = map_dir / tileset.get('source')
+                tileset = ElementTree.parse(source).getroot()
+                base_dir = source.parent
+            tilesets.append((firstgid, tileset, base_dir))
+        return sorted(tilesets, key=lambda entry: entry[0])
+
+    @classmethod
+    def tile_image(cls,
+            tilesets: list[tuple[int, ElementTree.Element, Path]], gid: int
+        ) -> tuple[Path, list[int]]:
+        """Image path and source rect of a gid without flags"""
+        firstgid, tileset, base_dir = next(entry for entry in reversed(tilesets) if entry[0] <= gid)
+        tile_id = gid - firstgid
+        image = tileset.find('image')
+        if image is None:
+            # Collection of images, one per tile
+            tile = next(tile for tile in tileset.iter('tile') if int(tile.get('id')) == tile_id)
+            image = tile.find('image')
+            return base_dir / image.get('source'), [0, 0, int(image.get('width')), int(image.get('height'))]
+        tilewidth, tileheight = int(tileset.get('tilewidth')), int(tileset.get('tileheight'))
+        margin, spacing = int(tileset.get('margin', 0)), int(tileset.get('spacing', 0))
+        columns = int(tileset.get('columns') or 0) or (
+            (int(image.get('width')) - 2 * margin + spacing) // (tilewidth + spacing)
+        )
+        return base_dir / image.get('source'), [
+            margin + tile_id % columns * (tilewidth + spacing),
+            margin + tile_id // columns * (tileheight + spacing),
+            tilewidth,
+            tileheight,
+        ]
+
+    @classmethod
+    def read_properties(cls, element: ElementTree.Element) -> dict:
+        properties = {}
+        for prop in element.iter('property'):
+            value = prop.get('value', prop.text)
+            kind = prop.get('type', 'string')
+            if kind == 'int':
+                value = int(value)
+            elif kind == 'float':
+                value = float(value)
+            elif kind == 'bool':
+                value = value == 'true'
+            properties[prop.get('name')] = value
+        return properties
+
+    @classmethod
+    def read(cls, map_path: Path) -> tuple[list, list, list, list[array]]:
+        """Returns the map size, atlas, layer metadata and grids in MapCache's layout"""
+        map_path = Path(map_path)
+        map_dir = map_path.parent
+        root = ElementTree.parse(map_path).getroot()
+        tilewidth, tileheight = int(root.get('tilewidth')), int(root.get('tileheight'))
+        tilesets = cls.read_tilesets(root, map_dir)
+        # Tile layers before object layers, the order pytmx gives finite maps
+        elements = sorted(cls.iter_layers(root), key=lambda element: element.tag != 'layer')
+
+        # (x, y, width, height, gids) per tile layer, in tiles
+        chunks = {}
+        for element in elements:
+            if element.tag != 'layer':
+                continue
+            data = element.find('data')
+            layer_chunks = [
+                (int(chunk.get('x')), int(chunk.get('y')), int(chunk.get('width')), int(chunk.get('height')),
+                 cls.decode(data, chunk.text or ''))
+                for chunk in data.iter('chunk')
+            ]
+            if not layer_chunks and (data.text or '').strip():
+                layer_chunks.append(
+                    (0, 0, int(element.get('width')), int(element.get('height')), cls.decode(data, data.text))
+                )
+            chunks[element] = layer_chunks
+        # Chunks are padded to a fixed size, the map bounds hug the cells actually used
+        used = [
+            (x + index % chunk_width, y + index // chunk_width)
+            for layer_chunks in chunks.values()
+            for x, y, chunk_width, _, gids in layer_chunks
+            for index, gid in enumerate(gids) if gid
+        ]
+        left = min((cell[0] for cell in used), default=0)
+        top = min((cell[1] for cell in used), default=0)
+        width = max((cell[0] + 1 for cell in used), default=0) - left
+        height = max((cell[1] + 1 for cell in used), default=0) - top
+
+        atlas = [None]
+        atlas_indices = {0: 0}
+        def atlas_index(gid: int) -> int:
+            if gid not in atlas_indices:
+                path, rect = cls.tile_image(tilesets, gid & cls.gid_mask)
+                atlas_indices[gid] = len(atlas)
+                atlas.append([
+                    os.path.relpath(os.path.normpath(path), map_dir),
+                    rect,
+                    [
+                        bool(gid & cls.flipped_horizontally),
+                        bool(gid & cls.flipped_vertically),
+                        bool(gid & cls.flipped_diagonally),
+                    ],
+                ])
+            return atlas_indices[gid]
+
+        layers = []
+        grids = []
+        for element in elements:
+            if element.tag == 'layer':
+                grid = array('I', bytes(4 * width * height))
+                for x, y, chunk_width, _, gids in chunks[element]:
+                    for index, gid in enumerate(gids):
+                        if gid:
+                            grid[(y + index // chunk_width - top) * width + x + index % chunk_width - left] = (
+                                atlas_index(gid)
+                            )
+                layers.append({'kind': 'tile', 'name': element.get('name'), 'width': width, 'height': height})
+                grids.append(grid)
+            else:
+                objects = []
+                for obj in element.iter('object'):
+                    gid = int(obj.get('gid', 0)) & cls.gid_mask
+                    x = float(obj.get('x')) - left * tilewidth
+                    y = float(obj.get('y')) - top * tileheight
+                    obj_width, obj_height = float(obj.get('width', 0)), float(obj.get('height', 0))
+                    # Tile objects are anchored at their bottom left, pytmx moves them to the top left
+                    if gid:
+                        y -= obj_height
+                    objects.append([x, y, obj_width, obj_height, gid, obj.get('name'), cls.read_properties(obj)])
+                layers.append({'kind': 'object', 'name': element.get('name'), 'objects': objects})
+        return [width, height, tilewidth, tileheight], atlas, layers, grids
@@ -1,9 +1,20 @@
+import struct
+
 from pathlib import Path
+from typing import Hashable
 
 import pygame
 
+from .animation import AnimationClock
 from .character import Character
-from ..enums import FruitName
+from .timer import (
+    Timer,
+    TimerService
+)
+from ..enums import (
+    CheckpointStatus,
+    FruitName
+)
 from ..utils import Utils
 
 
@@ -13,18 +24,21 @@ class Fruit(pygame.sprite.Sprite):
     image_size = (64, 64)
     hitbox_size = (30, 30)
     animation_speed = 30
+    # Collected flag and frames into the collected effect, the fruit is gone once it left its groups
+    snapshot_format = struct.Struct('<?d')
 
     def __init__(self,
             position: tuple[float, float],
-            images: list[pygame.Surface],
-            collected_images: list[pygame.Surface]
+            animations: AnimationClock,
+            clip: Hashable,
+            collected_clip: Hashable
         ) -> None:
         super().__init__()
-        self.frame = 0
-        self.images = images
-        self.collected_images = collected_images
+        self.animations = animations
+        self.clip = clip
+        self.collected_clip = collected_clip
         self.collected = False
-        self.image = self.images[self.frame]
+        self.animations.subscribe(self, self.clip)
         self.rect = self.image.get_frect()
         self.hitbox = pygame.FRect((0, 0), self.hitbox_size)
         self.rect.topleft = position
@@ -40,18 +54,95 @@ class Fruit(pygame.sprite.Sprite):
 
     def handle_player_collision(self, player: Character) -> None:
         if self.hitbox.colliderect(player.hitbox) and not self.collected:
-            self.frame = 0
             self.collected = True
+            self.animations.play(self, self.collected_clip, self.kill)
+        return None
+
+    def kill(self) -> None:
+        self.animations.unsubscribe(self)
+        super().kill()
+        return None
+
+    def write_snapshot(self, buffer: bytearray, offset: int) -> None:
+        self.snapshot_format.pack_into(buffer, offset, self.collected, self.animations.get_elapsed(self))
+        return None
+
+    def read_snapshot(self, buffer: bytearray, offset: int) -> None:
+        """Group membership is restored by the owner, which kills the fruits that are gone"""
+        self.collected, elapsed = self.snapshot_format.unpack_from(buffer, offset)
+        if self.collected:
+            self.animations.play(self, self.collected_clip, self.kill, elapsed)
+        else:
+            self.animations.subscribe(self, self.clip)
+        return None
+
+
+class Checkpoint(pygame.sprite.Sprite):
+    """Raises its flag the first time the player touches it"""
+
+    # Constant
+    image_size = (64, 64)
+    hitbox_size = (24, 48)
+    animation_speed = 20
+    # Status index and frames into the flag coming out, followed by the flag timer
+    snapshot_format = struct.Struct('<bd')
+    snapshot_size = snapshot_format.size + Timer.snapshot_format.size
+    statuses = list(CheckpointStatus)
+
+    def __init__(self,
+            position: tuple[float, float],
+            animations: AnimationClock,
+            timers: TimerService | None = None
+        ) -> None:
+        super().__init__()
+        # Clips are named after the statuses
+        self.animations = animations
+        self.status = CheckpointStatus.NoFlag
+        self.animations.subscribe(self, self.status)
+        self.rect = self.image.get_frect(topleft=position)
+        self.hitbox = pygame.FRect((0, 0), self.hitbox_size)
+        self.hitbox.midbottom = self.rect.midbottom
+        # The flag is out once its animation played through
+        duration = len(self.animations.clips[CheckpointStatus.FlagOut].frames) / self.animation_speed * 1000
+        self.flag_timer = Timer(duration, self.raise_flag, service=timers)
+        return None
+
+    @classmethod
+    def load_images(cls, root_path: Path) -> dict[CheckpointStatus, list[pygame.Surface]]:
+        path = root_path / 'assets/images/items/checkpoints/checkpoint'
+        return {
+            status: Utils.read_spritesheet(
+                path=path / f'{status.value}.png', width=cls.image_size[0], height=cls.image_size[1]
+            ) for status in CheckpointStatus
+        }
+
+    def handle_player_collision(self, player: Character) -> bool:
+        """True when the player reached the checkpoint for the first time"""
+        if self.status != CheckpointStatus.NoFlag or not self.hitbox.colliderect(player.hitbox):
+            return False
+        self.status = CheckpointStatus.FlagOut
+        self.animations.play(self, self.status)
+        self.flag_timer.activate()
+        return True
+
+    def raise_flag(self) -> None:
+        self.status = CheckpointStatus.Flag
+        self.animations.subscribe(self, self.status)
+        return None
+
+    def write_snapshot(self, buffer: bytearray, offset: int) -> None:
+        self.snapshot_format.pack_into(
+            buffer, offset, self.statuses.index(self.status), self.animations.get_elapsed(self)
+        )
+        self.flag_timer.write_snapshot(buffer, offset + self.snapshot_format.size)
         return None
 
-    def update(self, dt: float):
-        self.frame += self.animation_speed * dt
-        if not self.collected:
-            frame_index = int(self.frame) % len(self.images)
-            self.image = self.images[frame_index]
+    def read_snapshot(self, buffer: bytearray, offset: int) -> None:
+        status, elapsed = self.snapshot_format.unpack_from(buffer, offset)
+        self.status = self.statuses[status]
+        self.flag_timer.read_snapshot(buffer, offset + self.snapshot_format.size)
+        if self.status == CheckpointStatus.FlagOut:
+            self.animations.play(self, self.status, elapsed=elapsed)
         else:
-            frame_index = int(self.frame) % len(self.collected_images)
-            self.image = self.collected_images[frame_index]
-            if self.frame >= len(self.collected_images):
-                self.kill()
+            self.animations.subscribe(self, self.status)
         return None
@@ -1,123 +1,401 @@
+from functools import partial
 from pathlib import Path
 
 import random
+import struct
 
 import pygame
 import pytmx
 
-from .tile import (
-    FallingPlatform,
-    Platform,
-    Terrain,
-)
+from .tile import FallingPlatform
+from .animation import AnimationClock
+from .assets import AssetRegistry
 from .background import Background
+from .camera import Camera
 from .character import Character
+from .chunked_layer import ChunkedLayer
+from .dirty_renderer import DirtyRectRenderer
+from .enemy import (
+    Enemy,
+    EnemyGroup
+)
 from .effect import (
     AnimatedEffect,
     Particle
 )
-from .item import Fruit
+from .item import (
+    Checkpoint,
+    Fruit
+)
+from .infinite_map import InfiniteMapReader
+from .map_cache import (
+    CompiledMap,
+    MapCache
+)
+from .particle_system import ParticleSystem
+from .profiler import Profiler
+from .render_queue import RenderQueue
+from .spatial_hash import SpatialHash
+from .tile_store import TileStore
+from .tile_stream import TileStream
+from .timer import TimerService
 from ..enums import (
     Axis,
+    CharacterStatus,
     Direction,
+    EnemyName,
     ParticleName,
     EffectName,
     FruitName,
+    RenderLayer,
+    SoundEffect,
 )
 
 
 class Map:
 
-    def __init__(self, root_path: Path) -> None:
+    # Render mode: composite static tiles into cached chunks instead of blitting each tile
+    prerender_static_tiles = True
+    # Load maps from the compiled binary cache, recompiling when the source changed
+    use_map_cache = True
+    # Collide against merged terrain rectangles instead of one rect per terrain tile
+    merge_collision_geometry = True
+    # Streaming mode: static colliders and baked chunks only exist around the camera,
+    # radius in chunks beyond the awake area and a ceiling on resident chunks
+    stream_tiles = False
+    stream_radius = 1
+    max_stream_chunks = 40
+    # Dust emitted by the player, intervals in seconds
+    run_dust_interval = 0.05
+    landing_dust_amount = 8
+    # Restores the last checkpoint snapshot, a gameplay key so recordings include it
+    respawn_key = pygame.K_r
+    # Map level state in front of the sprites in a snapshot: the dust timer
+    snapshot_format = struct.Struct('<d')
+
+    def __init__(self,
+            root_path: Path, view_size: tuple[int, int], objects_images: AssetRegistry | None = None
+        ) -> None:
         self.root_path = root_path
-        self.static_tiles = pygame.sprite.Group()
+        self.camera = Camera(view_size)
+        # Terrain and static platforms live in grids, only the colliders are objects
+        self.tile_store = None
         self.dynamic_tiles = pygame.sprite.Group()
         self.items = pygame.sprite.Group()
+        self.checkpoints = pygame.sprite.Group()
+        # Every fruit of the level, collected ones included, in snapshot order
+        self.fruits = []
+        self.tile_index = None
+        self.colliders = []
+        self.enemies = EnemyGroup()
+        self.static_layer = ChunkedLayer() if self.prerender_static_tiles else None
+        self.stream = None
         self.player = None
+        self.spawn_position = None
         self.background = None
-        self.objects_images = {
-            'effect': self.load_effect_images(),
-            'particle': self.load_particle_images()
-        }
+        self.particles = None
+        self.render_queue = RenderQueue()
+        # Fruits, falling platforms and checkpoints play shared clips advanced once per tick
+        self.animations = AnimationClock()
+        self.profiler = Profiler()
+        # Set by the game, maps without one are silent
+        self.audio = None
+        # Timers run on simulation time, so they pause, replay and fast-forward with the game.
+        # Each map has its own clock, a preloaded map or a restored snapshot leaves the others alone
+        self.timers = TimerService()
+        self.dirty_renderer = DirtyRectRenderer()
+        # Dirty rect rendering freezes the backdrop, so the background stops scrolling
+        self.scroll_background = True
+        self.dust_timer = 0
+        # Preallocated once the level is built, rewritten on entering and at each checkpoint
+        self.checkpoint_snapshot = None
+        self.checkpoint_reached = False
+        # Maps built for a level change share the registry, so decoded effects and fruits carry over
+        if objects_images is None:
+            self.objects_images = AssetRegistry()
+            self.register_assets()
+        else:
+            self.objects_images = objects_images
         return None
 
-    def load_effect_images(self) -> dict[EffectName, pygame.Surface]:
-        return {
-            effect_name: AnimatedEffect.load_images(self.root_path, effect_name)
-            for effect_name in EffectName
-        }
+    def register_assets(self) -> None:
+        # Nothing is decoded here, entries load on first access or from preload()
+        for effect_name in EffectName:
+            self.objects_images.register(
+                effect_name, partial(AnimatedEffect.load_images, self.root_path, effect_name)
+            )
+        for particle_name in ParticleName:
+            self.objects_images.register(
+                particle_name, partial(Particle.load_image, self.root_path, particle_name)
+            )
+        for fruit_name in FruitName:
+            self.objects_images.register(
+                fruit_name, partial(Fruit.load_images, self.root_path, fruit_name)
+            )
+        for enemy_name in EnemyName:
+            self.objects_images.register(
+                enemy_name, partial(Enemy.load_images, self.root_path, enemy_name)
+            )
+        self.objects_images.register('falling_platform', partial(FallingPlatform.load_images, self.root_path))
+        self.objects_images.register('checkpoint', partial(Checkpoint.load_images, self.root_path))
+        return None
 
-    def load_particle_images(self) -> dict[ParticleName, pygame.Surface]:
-        return {
-            particle_name: Particle.load_image(self.root_path, particle_name)
-            for particle_name in ParticleName
-        }
+    def asset_manifest(self, map_data: pytmx.TiledMap | CompiledMap) -> list:
+        # Fruit kinds are picked at random while setting up, so they load on demand
+        manifest = list(ParticleName)
+        for layer in map_data.layers:
+            if layer.name == 'falling_platform':
+                manifest.append('falling_platform')
+            elif layer.name == 'fruit':
+                manifest.append(EffectName.Collected)
+            elif layer.name == 'chekpoint':
+                manifest.append('checkpoint')
+            elif layer.name == 'enemy':
+                manifest += {EnemyName(obj.name) for obj in layer if obj.name}
+        return manifest
 
     def setup(self, map_data_path: str, player: Character, background: Background) -> None:
-        map_data_path = self.root_path / map_data_path
-        map_data = pytmx.load_pygame(map_data_path)
+        self.prepare(map_data_path, background)
+        self.enter(player)
+        return None
+
+    def prepare(self, map_data_path: str, background: Background, rng: random.Random = random) -> None:
+        """
+        Parse the map, decode its assets and build every tile, item and collider.
+        Nothing shared with a running map is touched, so this may run on a worker thread.
+        """
+        self.populate(self.load_map_data(self.root_path / map_data_path), background, rng)
+        return None
+
+    def populate(self,
+            map_data: pytmx.TiledMap | CompiledMap, background: Background, rng: random.Random = random
+        ) -> None:
+        """Build the level from already loaded map data, which is left untouched and can be reused"""
+        self.objects_images.preload(self.asset_manifest(map_data))
+        if self.particles is None:
+            self.particles = ParticleSystem({
+                particle_name: self.objects_images[particle_name] for particle_name in ParticleName
+            })
         self.background = background
-        self.static_tiles.empty()
+        # The old level's timers must not fire into the new one
+        for checkpoint in self.checkpoints.sprites():
+            checkpoint.flag_timer.deactivate()
+        self.animations.clear()
+        self.dynamic_tiles.empty()
         self.items.empty()
+        self.fruits.clear()
+        self.checkpoints.empty()
+        self.enemies.clear()
+        self.stream = None
+        self.tile_store = TileStore.from_map_data(map_data)
         for layer in map_data.layers:
-            if 'terrain' in layer.name:
-                self.set_up_terrain(layer, map_data.tilewidth, map_data.tileheight)
-            elif layer.name == 'static_platform':
-                self.set_up_static_platform(layer, map_data.tilewidth, map_data.tileheight)
-            elif layer.name == 'falling_platform':
+            if layer.name == 'falling_platform':
                 self.set_up_falling_platform(layer)
             elif layer.name == 'character':
-                self.set_up_player(layer, player)
+                self.set_up_spawn(layer)
             elif layer.name == 'fruit':
-                self.set_up_fruit(layer)
+                self.set_up_fruit(layer, rng)
+            elif layer.name == 'enemy':
+                self.set_up_enemies(layer, rng)
+            elif layer.name == 'chekpoint':
+                self.set_up_checkpoints(layer)
+        # Particles follow the session seed too, drawn last so object picks stay the same for a seed
+        self.particles.seed(rng.getrandbits(64))
+        self.set_up_colliders()
+        self.set_up_tile_index(map_data.tilewidth, map_data.tileheight)
+        self.checkpoint_snapshot = self.create_snapshot_buffer()
+        self.camera.set_bounds(map_data.width * map_data.tilewidth, map_data.height * map_data.tileheight)
+        if self.stream_tiles:
+            self.set_up_stream(map_data)
+            return None
+        self.enemies.bodies.set_grid(*self.tile_store.get_physics_grid(), map_data.tilewidth, map_data.tileheight)
+        if self.static_layer is not None:
+            self.static_layer.bake(self.tile_store.get_blits())
         return None
 
-    def set_up_terrain(self, layer: pytmx.pytmx.TiledTileLayer, tilewidth: float, tileheight: float) -> None:
-        slidable = 'slidable' in layer.name
-        for x, y, surface in layer.tiles():
-            self.static_tiles.add(Terrain((x * tilewidth, y * tileheight), surface, slidable))
+    def set_up_stream(self, map_data: CompiledMap) -> None:
+        # Stream chunks line up with the baked chunks, one surface each
+        chunk_size = ChunkedLayer.chunk_size
+        chunk_tiles = (max(1, chunk_size[0] // map_data.tilewidth), max(1, chunk_size[1] // map_data.tileheight))
+        if self.static_layer is not None:
+            self.static_layer = ChunkedLayer(
+                (chunk_tiles[0] * map_data.tilewidth, chunk_tiles[1] * map_data.tileheight)
+            )
+        self.stream = TileStream(
+            self.tile_store, chunk_tiles, self.stream_radius, self.max_stream_chunks,
+            self.merge_collision_geometry, self.tile_index, self.static_layer,
+        )
+        self.enemies.bodies.set_grid(*self.tile_store.get_physics_grid(), map_data.tilewidth, map_data.tileheight)
+        # Load around the spawn already, so entering the map only streams what moved
+        self.camera.follow(pygame.FRect(self.spawn_position, Character.image_size), snap=True)
+        self.stream.update(self.camera.awake_area)
         return None
 
-    def set_up_static_platform(self, layer: pytmx.pytmx.TiledTileLayer, tilewidth: float, tileheight: float) -> None:
-        for x, y, surface in layer.tiles():
-            self.static_tiles.add(
-                Platform((x * tilewidth, (y + 1) * tileheight), surface, 'bottomleft')
-            )
+    def enter(self, player: Character) -> None:
+        """Place the player on a prepared map, cheap enough to run between two frames"""
+        self.player = player
+        # Nothing from the previous level carries over, the checkpoint snapshot below included
+        self.player.reset()
+        self.player.set_init_postion(self.spawn_position)
+        self.particles.clear()
+        self.camera.follow(self.player.rect, snap=True)
+        if self.stream is not None:
+            self.stream.update(self.camera.awake_area)
+        self.dirty_renderer.invalidate()
+        # Respawning before any checkpoint goes back to the start of the level
+        self.save_snapshot(self.checkpoint_snapshot)
+        return None
+
+    def get_snapshot_size(self) -> int:
+        return (
+            self.snapshot_format.size
+            + self.animations.get_snapshot_size()
+            + Character.snapshot_format.size
+            + len(self.fruits) * (1 + Fruit.snapshot_format.size)
+            + len(self.dynamic_tiles) * FallingPlatform.snapshot_format.size
+            + len(self.checkpoints) * Checkpoint.snapshot_size
+            + self.enemies.get_snapshot_size()
+        )
+
+    def create_snapshot_buffer(self) -> bytearray:
+        """A buffer sized for this level, reuse it across save_snapshot calls"""
+        return bytearray(self.get_snapshot_size())
+
+    def save_snapshot(self, buffer: bytearray) -> None:
+        """
+        Write the simulation state into buffer: the animation clips, the player, fruits,
+        falling platforms, checkpoints with their timers and the enemies. Static tiles
+        never change and are not part of it, nor are the particles, which are only visual.
+        """
+        self.snapshot_format.pack_into(buffer, 0, self.dust_timer)
+        offset = self.snapshot_format.size
+        self.animations.write_snapshot(buffer, offset)
+        offset += self.animations.get_snapshot_size()
+        self.player.write_snapshot(buffer, offset)
+        offset += Character.snapshot_format.size
+        buffer[offset:offset + len(self.fruits)] = bytes(fruit.alive() for fruit in self.fruits)
+        offset += len(self.fruits)
+        for fruit in self.fruits:
+            fruit.write_snapshot(buffer, offset)
+            offset += Fruit.snapshot_format.size
+        for platform in self.dynamic_tiles.sprites():
+            platform.write_snapshot(buffer, offset)
+            offset += FallingPlatform.snapshot_format.size
+        for checkpoint in self.checkpoints.sprites():
+            checkpoint.write_snapshot(buffer, offset)
+            offset += Checkpoint.snapshot_size
+        self.enemies.write_snapshot(buffer, offset)
+        return None
+
+    def restore_snapshot(self, buffer: bytearray) -> None:
+        """Put the level back to a state written by save_snapshot, without rebuilding anything"""
+        self.dust_timer, = self.snapshot_format.unpack_from(buffer, 0)
+        offset = self.snapshot_format.size
+        self.animations.read_snapshot(buffer, offset)
+        offset += self.animations.get_snapshot_size()
+        self.player.read_snapshot(buffer, offset)
+        offset += Character.snapshot_format.size
+        alive = buffer[offset:offset + len(self.fruits)]
+        offset += len(self.fruits)
+        self.items.empty()
+        for fruit, fruit_alive in zip(self.fruits, alive):
+            fruit.read_snapshot(buffer, offset)
+            offset += Fruit.snapshot_format.size
+            if fruit_alive:
+                self.items.add(fruit)
+            else:
+                fruit.kill()
+        for platform in self.dynamic_tiles.sprites():
+            platform.read_snapshot(buffer, offset)
+            offset += FallingPlatform.snapshot_format.size
+        self.update_tile_index()
+        for checkpoint in self.checkpoints.sprites():
+            checkpoint.read_snapshot(buffer, offset)
+            offset += Checkpoint.snapshot_size
+        self.enemies.read_snapshot(buffer, offset)
+        self.checkpoint_reached = False
+        self.particles.clear()
+        self.camera.follow(self.player.rect, snap=True)
+        if self.stream is not None:
+            self.stream.update(self.camera.awake_area)
+        self.dirty_renderer.invalidate()
+        return None
+
+    def respawn(self) -> None:
+        """Back to the last checkpoint, keys held right now stay held"""
+        accerleration_direction = dict(self.player.accerleration_direction)
+        skip_platform = self.player.skip_platform
+        self.restore_snapshot(self.checkpoint_snapshot)
+        self.player.accerleration_direction.update(accerleration_direction)
+        self.player.skip_platform = skip_platform
+        return None
+
+    def set_up_colliders(self) -> None:
+        # Streamed levels build their static colliders chunk by chunk
+        if self.stream_tiles:
+            self.colliders = []
+        else:
+            self.colliders = self.tile_store.get_colliders(self.merge_collision_geometry)
         return None
 
+    def set_up_tile_index(self, tilewidth: float, tileheight: float) -> None:
+        # Static colliders go first to keep the same resolution order as before
+        self.tile_index = SpatialHash(tilewidth, tileheight)
+        for tile in self.colliders + self.dynamic_tiles.sprites():
+            self.tile_index.insert(tile)
+        return None
+
+    def load_map_data(self, map_data_path: Path) -> pytmx.TiledMap | CompiledMap:
+        # Streaming reads the compiled grids, and pytmx can't read infinite maps at all
+        if self.use_map_cache or self.stream_tiles or InfiniteMapReader.is_infinite(map_data_path):
+            return MapCache.load_or_compile(self.root_path, map_data_path)
+        return pytmx.load_pygame(str(map_data_path))
+
     def set_up_falling_platform(self, layer: pytmx.pytmx.TiledTileLayer) -> None:
-        if layer.name not in self.objects_images:
-            self.objects_images[layer.name] = FallingPlatform.load_images(self.root_path)
+        for status, images in self.objects_images[layer.name].items():
+            self.animations.add_clip(status, images, FallingPlatform.animation_speed)
         for position in layer:
-            self.dynamic_tiles.add(FallingPlatform(
-                (position.x, position.y), self.objects_images[layer.name], 'topleft')
-            )
+            self.dynamic_tiles.add(FallingPlatform((position.x, position.y), self.animations, 'topleft'))
         return None
 
-    def set_up_player(self, layer: pytmx.pytmx.TiledGroupLayer, player: Character) -> None:
+    def set_up_spawn(self, layer: pytmx.pytmx.TiledGroupLayer) -> None:
         assert len(layer) == 1
-        self.player = player
-        self.player.set_init_postion((layer[0].x, layer[0].y))
+        self.spawn_position = (layer[0].x, layer[0].y)
+        return None
+
+    def set_up_fruit(self, layer: pytmx.pytmx.TiledGroupLayer, rng: random.Random = random) -> None:
+        self.animations.add_clip(EffectName.Collected, self.objects_images[EffectName.Collected], Fruit.animation_speed)
+        fruit_name = rng.choice(list(FruitName))
+        for position in layer:
+            fruit_name = rng.choice(list(FruitName))
+            self.animations.add_clip(fruit_name, self.objects_images[fruit_name], Fruit.animation_speed)
+            fruit = Fruit((position.x, position.y), self.animations, fruit_name, EffectName.Collected)
+            self.items.add(fruit)
+            self.fruits.append(fruit)
         return None
 
-    def set_up_fruit(self, layer: pytmx.pytmx.TiledGroupLayer) -> None:
-        if layer.name not in self.objects_images:
-            self.objects_images |= {
-                fruit_name: Fruit.load_images(self.root_path, fruit_name)
-                for fruit_name in FruitName
-            }
-        fruit_name = random.choice(list(FruitName))
+    def set_up_checkpoints(self, layer: pytmx.pytmx.TiledGroupLayer) -> None:
+        for status, images in self.objects_images['checkpoint'].items():
+            self.animations.add_clip(status, images, Checkpoint.animation_speed)
         for position in layer:
-            fruit_name = random.choice(list(FruitName))
-            self.items.add(Fruit(
-                (position.x, position.y),
-                self.objects_images[fruit_name],
-                self.objects_images['effect'][EffectName.Collected]
-            ))
+            self.checkpoints.add(Checkpoint((position.x, position.y), self.animations, self.timers))
+        return None
+
+    def set_up_enemies(self, layer: pytmx.pytmx.TiledGroupLayer, rng: random.Random = random) -> None:
+        # Objects are named after the enemy, unnamed ones get a random kind
+        for position in layer:
+            enemy_name = EnemyName(position.name) if position.name else rng.choice(list(EnemyName))
+            self.enemies.add(
+                enemy_name,
+                self.objects_images[enemy_name],
+                (position.x + position.width / 2, position.y + position.height),
+                rng.random() * 8,
+            )
         return None
 
     def handle_player_tile_collision(self, axis: Axis) -> None:
-        for tile in self.static_tiles.sprites() + self.dynamic_tiles.sprites():
+        # Resolution only moves the hitbox back towards tracking_rect, so the union covers every candidate
+        for tile in self.tile_index.query(self.player.hitbox.union(self.player.tracking_rect)):
             if not tile.rect.colliderect(self.player.hitbox):
                 continue
             tile.handle_player_collision(self.player, axis)
@@ -125,7 +403,17 @@ class Map:
 
     def handle_player_item_collision(self) -> None:
         for item in self.items.sprites():
-            item.handle_player_collision(self.player)
+            if self.camera.is_awake(item.rect) and not item.collected:
+                item.handle_player_collision(self.player)
+                if item.collected:
+                    self.play_sound(SoundEffect.FruitCollect)
+        return None
+
+    def handle_player_checkpoint_collision(self) -> None:
+        for checkpoint in self.checkpoints.sprites():
+            if checkpoint.handle_player_collision(self.player):
+                # Saved once the tick is over, so restoring resumes at a tick boundary
+                self.checkpoint_reached = True
         return None
 
     def handle_player_contact(self) -> None:
@@ -133,35 +421,140 @@ class Map:
         for direction in Direction:
             if direction != Direction.Top:
                 self.player.contact_checker[direction] = False
-        for tile in self.static_tiles.sprites() + self.dynamic_tiles.sprites():
-            for direction in Direction:
-                if direction == Direction.Top:
-                    continue
+        for direction, contact_rect in self.player.contact_rect.items():
+            for tile in self.tile_index.query(contact_rect):
                 if tile.check_player_contact(self.player, direction):
                     self.player.contact_checker[direction] = True
+                    break
+        return None
+
+    def update_tile_index(self) -> None:
+        for tile in self.dynamic_tiles.sprites():
+            self.tile_index.move(tile)
         return None
 
     def handle_input_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == self.respawn_key:
+            self.respawn()
+            return None
+        jump_counter = self.player.jump_counter
         self.player.handle_input_event(event)
+        if self.player.jump_counter > jump_counter:
+            self.play_sound(SoundEffect.Jump)
+        return None
+
+    def play_sound(self, effect: SoundEffect) -> None:
+        if self.audio is not None:
+            self.audio.play(effect)
         return None
 
     def update(self, dt: float) -> None:
+        profiler = self.profiler
+        self.timers.advance(dt * 1000)
+        self.player.store_previous_position()
+        profiler.start('move_x')
         self.player.move(dt, Axis.Horizontal)
+        profiler.stop('move_x')
+        profiler.start('collision_x')
         self.handle_player_tile_collision(Axis.Horizontal)
+        profiler.stop('collision_x')
+        profiler.start('move_y')
         self.player.move(dt, Axis.Vertical)
+        profiler.stop('move_y')
+        profiler.start('collision_y')
         self.handle_player_tile_collision(Axis.Vertical)
+        profiler.stop('collision_y')
+        profiler.start('contact')
         self.handle_player_contact()
+        profiler.stop('contact')
+        profiler.start('item_collision')
         self.handle_player_item_collision()
-        self.background.update(dt)
-        self.dynamic_tiles.update(dt)
+        self.handle_player_checkpoint_collision()
+        profiler.stop('item_collision')
+        profiler.start('group_updates')
+        if self.scroll_background:
+            self.background.update(dt)
+        self.update_tile_index()
+        previous_status = self.player.status
         self.player.update(dt)
-        self.items.update(dt)
+        profiler.stop('group_updates')
+        profiler.start('enemies')
+        self.enemies.update(dt, self.camera.awake_area)
+        profiler.stop('enemies')
+        profiler.start('particles')
+        self.emit_player_dust(previous_status, dt)
+        self.particles.update(dt)
+        profiler.stop('particles')
+        profiler.start('animations')
+        self.animations.advance(dt)
+        profiler.stop('animations')
+        self.camera.follow(self.player.rect)
+        if self.stream is not None:
+            profiler.start('stream')
+            if self.stream.update(self.camera.awake_area):
+                self.dirty_renderer.invalidate()
+            profiler.stop('stream')
+        if self.checkpoint_reached:
+            self.save_snapshot(self.checkpoint_snapshot)
+            self.checkpoint_reached = False
+        # Falling out of the level counts as a death
+        if self.player.hitbox.top > self.camera.bounds.bottom:
+            self.play_sound(SoundEffect.PlayerHit)
+            self.respawn()
         return None
 
-    def draw(self, screen: pygame.Surface) -> None:
-        self.background.draw(screen)
-        self.static_tiles.draw(screen)
-        self.dynamic_tiles.draw(screen)
-        self.player.draw(screen)
-        self.items.draw(screen)
+    def emit_player_dust(self, previous_status: CharacterStatus | None, dt: float) -> None:
+        status = self.player.status
+        feet = self.player.hitbox.midbottom
+        if status in (CharacterStatus.Idle, CharacterStatus.Run) and previous_status in (
+            CharacterStatus.Fall, CharacterStatus.Jump, CharacterStatus.AirJump, CharacterStatus.WallSlide
+        ):
+            self.particles.emit(ParticleName.Dust, feet, self.landing_dust_amount, spread=1.4)
+        if status != CharacterStatus.Run:
+            self.dust_timer = 0
+            return None
+        self.dust_timer += dt
+        if self.dust_timer >= self.run_dust_interval:
+            self.dust_timer -= self.run_dust_interval
+            # Kicked up behind the player
+            direction = (-1, -1) if self.player.velocity.x > 0 else (1, -1)
+            self.particles.emit(ParticleName.Dust, feet, 1, direction=direction, spread=0.5)
         return None
+
+    def get_visible_sprite_blits(self,
+            group: pygame.sprite.Group, view: pygame.Rect
+        ) -> list[tuple[pygame.Surface, tuple[float, float]]]:
+        return [
+            (sprite.image, (sprite.rect.x - view.x, sprite.rect.y - view.y))
+            for sprite in group.sprites() if view.colliderect(sprite.rect)
+        ]
+
+    def fill_render_queue(self, view: pygame.Rect, alpha: float = 1) -> None:
+        queue = self.render_queue
+        queue.extend(RenderLayer.Background, self.background.get_blits(view.size))
+        if self.static_layer is not None:
+            queue.extend(RenderLayer.StaticTiles, self.static_layer.get_blits(view))
+        else:
+            queue.extend(RenderLayer.StaticTiles, self.tile_store.get_blits(self.tile_store.get_region(view, 1), view.topleft))
+        queue.extend(RenderLayer.DynamicTiles, self.get_visible_sprite_blits(self.dynamic_tiles, view))
+        queue.extend(RenderLayer.Enemies, self.enemies.get_blits(view))
+        queue.extend(RenderLayer.Particles, self.particles.get_blits(view))
+        queue.add(RenderLayer.Player, *self.player.get_blit(view.topleft, alpha))
+        queue.extend(RenderLayer.Items, self.get_visible_sprite_blits(self.checkpoints, view))
+        queue.extend(RenderLayer.Items, self.get_visible_sprite_blits(self.items, view))
+        return None
+
+    def draw(self, screen: pygame.Surface, alpha: float = 1) -> None:
+        """alpha is how far rendering is between the previous and the current tick"""
+        self.camera.resize(screen.get_size())
+        view = pygame.Rect(self.camera.get_offset(alpha), screen.get_size())
+        self.fill_render_queue(view, alpha)
+        self.render_queue.flush(screen)
+        return None
+
+    def draw_dirty(self, screen: pygame.Surface, alpha: float = 1) -> list[pygame.Rect]:
+        """Repaint only what changed since the last call, returns the rects to pass to display.update"""
+        self.camera.resize(screen.get_size())
+        view = pygame.Rect(self.camera.get_offset(alpha), screen.get_size())
+        self.fill_render_queue(view, alpha)
+        return self.dirty_renderer.render(screen, self.render_queue, (view.topleft, self.background.start_position))
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ElementTree
+
+from array import array
+from pathlib import Path
+
+import pygame
+import pytmx
+
+from .infinite_map import InfiniteMapReader
+
+
+class CompiledObject:
+
+    def __init__(self,
+            x: float, y: float, width: float, height: float, gid: int, name: str | None, properties: dict
+        ) -> None:
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.gid = gid
+        self.name = name
+        self.properties = properties
+        return None
+
+
+class CompiledObjectLayer(list):
+
+    def __init__(self, name: str, objects: list[CompiledObject]) -> None:
+        super().__init__(objects)
+        self.name = name
+        return None
+
+
+class CompiledTileLayer:
+
+    def __init__(self,
+            name: str, width: int, height: int, data: array, images: list[pygame.Surface | None]
+        ) -> None:
+        self.name = name
+        self.width = width
+        self.height = height
+        # Row-major atlas indices, 0 is an empty cell
+        self.data = data
+        self.images = images
+        return None
+
+    def tiles(self):
+        width = self.width
+        images = self.images
+        for index, atlas_index in enumerate(self.data):
+            if atlas_index:
+                yield index % width, index // width, images[atlas_index]
+
+
+class CompiledMap:
+    """Same surface as pytmx.TiledMap for everything Map.setup reads"""
+
+    def __init__(self,
+            width: int, height: int, tilewidth: int, tileheight: int, layers: list
+        ) -> None:
+        self.width = width
+        self.height = height
+        self.tilewidth = tilewidth
+        self.tileheight = tileheight
+        self.layers = layers
+        return None
+
+
+class MapCache:
+    """
+    Binary layout: header, JSON metadata, then one packed uint32 grid per tile layer.
+    The metadata records every source file with its mtime and a combined hash, so a
+    touched but unchanged file does not force a recompile.
+    """
+
+    magic = b'CMAP'
+    version = 1
+    header = struct.Struct('<4sHI')
+    cache_dir = '.cache/maps'
+
+    @classmethod
+    def cache_path(cls, root_path: Path, map_path: Path) -> Path:
+        digest = hashlib.sha1(str(Path(map_path).resolve()).encode()).hexdigest()[:8]
+        return root_path / cls.cache_dir / f'{Path(map_path).stem}-{digest}.cmap'
+
+    @classmethod
+    def source_files(cls, map_path: Path) -> list[Path]:
+        map_path = Path(map_path)
+        sources = [map_path]
+        for tileset in ElementTree.parse(map_path).getroot().iter('tileset'):
+            if 'source' in tileset.attrib:
+                sources.append(map_path.parent / tileset.attrib['source'])
+        return sources
+
+    @classmethod
+    def hash_files(cls, paths: list[Path]) -> str:
+        digest = hashlib.sha1()
+        for path in paths:
+            digest.update(Path(path).read_bytes())
+        return digest.hexdigest()
+
+    @classmethod
+    def read(cls, map_path: Path) -> tuple[list, list, list, list[array]]:
+        """Map size, atlas, layer metadata and tile grids of a source map"""
+        map_dir = map_path.parent
+        map_data = pytmx.TiledMap(str(map_path))
+
+        # Atlas entries are (image path relative to the map, source rect, flip flags)
+        atlas = [None]
+        atlas_indices = {0: 0}
+        layers = []
+        grids = []
+        for layer in map_data.layers:
+            if isinstance(layer, pytmx.TiledTileLayer):
+                grid = array('I', bytes(4 * layer.width * layer.height))
+                for y, row in enumerate(layer.data):
+                    for x, gid in enumerate(row):
+                        if gid not in atlas_indices:
+                            path, rect, flags = map_data.images[gid]
+                            atlas_indices[gid] = len(atlas)
+                            atlas.append([
+                                os.path.relpath(os.path.normpath(path), map_dir),
+                                list(rect),
+                                [flags.flipped_horizontally, flags.flipped_vertically, flags.flipped_diagonally],
+                            ])
+                        grid[y * layer.width + x] = atlas_indices[gid]
+                layers.append({'kind': 'tile', 'name': layer.name, 'width': layer.width, 'height': layer.height})
+                grids.append(grid)
+            elif isinstance(layer, pytmx.TiledObjectGroup):
+                layers.append({
+                    'kind': 'object',
+                    'name': layer.name,
+                    'objects': [
+                        [obj.x, obj.y, obj.width, obj.height, obj.gid, obj.name, obj.properties]
+                        for obj in layer
+                    ],
+                })
+        return [map_data.width, map_data.height, map_data.tilewidth, map_data.tileheight], atlas, layers, grids
+
+    @classmethod
+    def compile(cls, map_path: Path, cache_path: Path) -> None:
+        map_path = Path(map_path)
+        map_dir = map_path.parent
+        sources = cls.source_files(map_path)
+        # pytmx can't read infinite maps, they go through our own reader
+        if InfiniteMapReader.is_infinite(map_path):
+            size, atlas, layers, grids = InfiniteMapReader.read(map_path)
+        else:
+            size, atlas, layers, grids = cls.read(map_path)
+        meta = {
+            'sources': [
+                [os.path.relpath(source, map_dir), os.stat(source).st_mtime_ns] for source in sources
+            ],
+            'hash': cls.hash_files(sources),
+            'size': size,
+            'atlas': atlas,
+            'layers': layers,
+        }
+        for grid in grids:
+            if sys.byteorder != 'little':
+                grid.byteswap()
+        cls.write(cache_path, meta, b''.join(grid.tobytes() for grid in grids))
+        return None
+
+    @classmethod
+    def write(cls, cache_path: Path, meta: dict, grids: bytes) -> None:
+        meta = json.dumps(meta).encode()
+        # Pad so the grids start 4-byte aligned
+        meta += b' ' * (-(cls.header.size + len(meta)) % 4)
+        cache_path = Path(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix('.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(cls.header.pack(cls.magic, cls.version, len(meta)))
+            f.write(meta)
+            f.write(grids)
+        os.replace(temp_path, cache_path)
+        return None
+
+    @classmethod
+    def read_meta(cls, buffer: mmap.mmap) -> tuple[dict, int] | None:
+        if len(buffer) < cls.header.size:
+            return None
+        magic, version, meta_size = cls.header.unpack_from(buffer)
+        if magic != cls.magic or version != cls.version:
+            return None
+        offset = cls.header.size + meta_size
+        return json.loads(buffer[cls.header.size:offset]), offset
+
+    @classmethod
+    def get_source_mtimes(cls, meta: dict, map_dir: Path) -> list[int] | None:
+        """Current mtimes of the sources, None when one is missing or its content changed"""
+        sources = [map_dir / source for source, _ in meta['sources']]
+        try:
+            mtimes = [os.stat(path).st_mtime_ns for path in sources]
+            if mtimes != [mtime for _, mtime in meta['sources']] and cls.hash_files(sources) != meta['hash']:
+                return None
+        except OSError:
+            return None
+        return mtimes
+
+    @classmethod
+    def load(cls, map_path: Path, cache_path: Path) -> CompiledMap | None:
+        """Load a compiled map through a memory map, None if missing or stale"""
+        map_dir = Path(map_path).parent
+        try:
+            f = open(cache_path, 'rb')
+        except OSError:
+            return None
+        grids = None
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                header = cls.read_meta(buffer)
+                if header is None:
+                    return None
+                meta, offset = header
+                mtimes = cls.get_source_mtimes(meta, map_dir)
+                if mtimes is None:
+                    return None
+                map_data = cls.load_buffer(buffer, meta, offset, map_dir)
+                if mtimes != [mtime for _, mtime in meta['sources']]:
+                    grids = buffer[offset:]
+        if grids is not None:
+            # Touched but unchanged, record the new mtimes so later loads skip the hash again
+            for source, mtime in zip(meta['sources'], mtimes):
+                source[1] = mtime
+            cls.write(cache_path, meta, grids)
+        return map_data
+
+    @classmethod
+    def load_buffer(cls, buffer: mmap.mmap, meta: dict, offset: int, map_dir: Path) -> CompiledMap:
+        """Build the map from the metadata and the grids from offset on, freshness is checked by load"""
+        images = cls.load_atlas(meta['atlas'], map_dir)
+        layers = []
+        with memoryview(buffer) as view:
+            for layer in meta['layers']:
+                if layer['kind'] == 'tile':
+                    size = 4 * layer['width'] * layer['height']
+                    data = array('I')
+                    data.frombytes(view[offset:offset + size])
+                    if sys.byteorder != 'little':
+                        data.byteswap()
+                    offset += size
+                    layers.append(CompiledTileLayer(
+                        layer['name'], layer['width'], layer['height'], data, images
+                    ))
+                else:
+                    layers.append(CompiledObjectLayer(
+                        layer['name'], [CompiledObject(*obj) for obj in layer['objects']]
+                    ))
+        return CompiledMap(*meta['size'], layers)
+
+    @classmethod
+    def load_atlas(cls, atlas: list, map_dir: Path) -> list[pygame.Surface | None]:
+        sheets = {}
+        images = [None]
+        for path, rect, (flip_x, flip_y, flip_diagonal) in atlas[1:]:
+            if path not in sheets:
+                sheets[path] = pygame.image.load(map_dir / path).convert_alpha()
+            image = sheets[path].subsurface(rect)
+            # Same transforms pytmx applies for flipped gids
+            if flip_diagonal:
+                image = pygame.transform.flip(pygame.transform.rotate(image, 270), True, False)
+            if flip_x or flip_y:
+                image = pygame.transform.flip(image, flip_x, flip_y)
+            images.append(image)
+        return images
+
+    @classmethod
+    def load_or_compile(cls, root_path: Path, map_path: Path) -> CompiledMap:
+        cache_path = cls.cache_path(root_path, map_path)
+        map_data = cls.load(map_path, cache_path)
+        if map_data is None:
+            cls.compile(map_path, cache_path)
+            map_data = cls.load(map_path, cache_path)
+        return map_data
+
+
+if __name__ == '__main__':
+    # Offline compile: python -m src.components.map_cache data/maps/*.tmx
+    root_path = Path(__file__).absolute().parents[2]
+    for map_path in sys.argv[1:]:
+        cache_path = MapCache.cache_path(root_path, Path(map_path))
+        MapCache.compile(Path(map_path), cache_path)
+        print(f'{map_path} -> {cache_path}')
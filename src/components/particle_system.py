@@ -0,0 +1,137 @@
+import numpy as np
+import pygame
+
+from ..enums import ParticleName
+
+
+class ParticlePool:
+    """
+    Live particles of one image, stored as preallocated arrays. Alive particles are
+    always packed at the front, so every update is a handful of vectorized operations.
+    """
+
+    def __init__(self, image: pygame.Surface, capacity: int = 4096) -> None:
+        assert capacity > 0
+        self.image = image
+        self.capacity = capacity
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.count = 0
+        return None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def emit(self, positions: np.ndarray, velocities: np.ndarray, lives: np.ndarray) -> None:
+        # Particles that don't fit are dropped rather than growing the arrays mid-frame
+        amount = min(len(positions), self.capacity - self.count)
+        if amount <= 0:
+            return None
+        end = self.count + amount
+        self.position[self.count:end] = positions[:amount]
+        self.velocity[self.count:end] = velocities[:amount]
+        self.life[self.count:end] = lives[:amount]
+        self.count = end
+        return None
+
+    def clear(self) -> None:
+        self.count = 0
+        return None
+
+    def update(self, dt: float) -> None:
+        count = self.count
+        if not count:
+            return None
+        self.position[:count] += self.velocity[:count] * dt
+        self.life[:count] -= dt
+        alive = self.life[:count] > 0
+        alive_count = int(np.count_nonzero(alive))
+        if alive_count != count:
+            self.position[:alive_count] = self.position[:count][alive]
+            self.velocity[:alive_count] = self.velocity[:count][alive]
+            self.life[:alive_count] = self.life[:count][alive]
+            self.count = alive_count
+        return None
+
+    def get_blits(self, view: pygame.Rect) -> list[tuple[pygame.Surface, list[int]]]:
+        if not self.count:
+            return []
+        width, height = self.image.get_size()
+        position = self.position[:self.count] - (view.x, view.y)
+        visible = (
+            (position[:, 0] > -width) & (position[:, 0] < view.width)
+            & (position[:, 1] > -height) & (position[:, 1] < view.height)
+        )
+        image = self.image
+        return [(image, point) for point in position[visible].astype(np.int32).tolist()]
+
+    def draw(self, screen: pygame.Surface, view: pygame.Rect) -> None:
+        screen.blits(self.get_blits(view), doreturn=False)
+        return None
+
+
+class ParticleSystem:
+
+    # Defaults for emit(), velocities in pixels per second and lives in seconds
+    speed = 40
+    life = 0.4
+
+    def __init__(self,
+            images: dict[ParticleName, pygame.Surface], capacity: int = 4096, seed: int | None = None
+        ) -> None:
+        self.pools = {name: ParticlePool(image, capacity) for name, image in images.items()}
+        self.rng = np.random.default_rng(seed)
+        return None
+
+    def seed(self, seed: int) -> None:
+        """Restart the spread and speed jitter from seed, so a recording replays the same bursts"""
+        self.rng = np.random.default_rng(seed)
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(pool) for pool in self.pools.values())
+
+    def emit(self,
+            particle_name: ParticleName,
+            position: tuple[float, float],
+            amount: int,
+            direction: tuple[float, float] = (0, -1),
+            spread: float = np.pi / 3,
+            speed: float | None = None,
+            life: float | None = None,
+        ) -> None:
+        """Burst of amount particles centered on position, fanned out around direction"""
+        if amount <= 0:
+            return None
+        pool = self.pools[particle_name]
+        speed = self.speed if speed is None else speed
+        life = self.life if life is None else life
+        angle = np.arctan2(direction[1], direction[0]) + self.rng.uniform(-spread, spread, amount)
+        magnitude = speed * self.rng.uniform(0.5, 1, amount)
+        velocities = np.column_stack((np.cos(angle) * magnitude, np.sin(angle) * magnitude))
+        positions = np.empty((amount, 2))
+        positions[:] = (position[0] - pool.image.get_width() / 2, position[1] - pool.image.get_height() / 2)
+        lives = life * self.rng.uniform(0.5, 1, amount)
+        pool.emit(positions, velocities, lives)
+        return None
+
+    def clear(self) -> None:
+        for pool in self.pools.values():
+            pool.clear()
+        return None
+
+    def update(self, dt: float) -> None:
+        for pool in self.pools.values():
+            pool.update(dt)
+        return None
+
+    def get_blits(self, view: pygame.Rect) -> list[tuple[pygame.Surface, list[int]]]:
+        blits = []
+        for pool in self.pools.values():
+            blits.extend(pool.get_blits(view))
+        return blits
+
+    def draw(self, screen: pygame.Surface, view: pygame.Rect) -> None:
+        screen.blits(self.get_blits(view), doreturn=False)
+        return None
@@ -0,0 +1,236 @@
+import math
+
+import numpy as np
+import pygame
+
+from .character import Character
+
+
+class PhysicsBodies:
+    """
+    Axis aligned bodies stored as arrays, one row per body, integrated and collided
+    against the tile grid in a few vectorized operations per step. Bodies walk in
+    their direction and turn around at walls and, optionally, at ledges.
+
+    The grid resolution assumes a body moves less than one tile per step, which
+    holds for the fixed tick at the speeds used here.
+    """
+
+    gravity = Character.gravity
+    wall_friction = Character.wall_friction
+    # Horizontal acceleration towards the walk speed, pixels per second squared
+    acceleration = 600
+    # Keeps edges lying exactly on a tile border out of the next cell
+    epsilon = 1e-3
+
+    # Per-body arrays, grown together
+    fields = ('position', 'size', 'velocity', 'walk_speed', 'direction', 'turn_at_ledges', 'on_ground', 'wall')
+    # The ones a step changes, the rest is fixed when the body is added
+    state_fields = ('position', 'velocity', 'direction', 'on_ground', 'wall')
+
+    def __init__(self, capacity: int = 64) -> None:
+        assert capacity > 0
+        self.count = 0
+        self.capacity = capacity
+        # Top left corners and sizes of the hitboxes
+        self.position = np.zeros((capacity, 2), dtype=np.float64)
+        self.size = np.zeros((capacity, 2), dtype=np.float64)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float64)
+        self.walk_speed = np.zeros(capacity, dtype=np.float64)
+        # -1 walks left, 1 walks right
+        self.direction = np.zeros(capacity, dtype=np.int8)
+        self.turn_at_ledges = np.zeros(capacity, dtype=bool)
+        self.on_ground = np.zeros(capacity, dtype=bool)
+        # Side of the wall touched during the last step, -1 left, 1 right, 0 none
+        self.wall = np.zeros(capacity, dtype=np.int8)
+        self.solid = np.zeros((0, 0), dtype=bool)
+        # Top of the one-way platform in each cell, nan where there is none
+        self.platform_top = np.zeros((0, 0), dtype=np.float64)
+        self.tilewidth = 1
+        self.tileheight = 1
+        return None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def grow(self) -> None:
+        self.capacity *= 2
+        for name in self.fields:
+            array = getattr(self, name)
+            grown = np.zeros((self.capacity, *array.shape[1:]), dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            setattr(self, name, grown)
+        return None
+
+    def set_grid(self,
+            solid: np.ndarray, platform_top: np.ndarray, tilewidth: float, tileheight: float
+        ) -> None:
+        assert solid.shape == platform_top.shape
+        self.solid = solid
+        self.platform_top = platform_top
+        self.tilewidth = tilewidth
+        self.tileheight = tileheight
+        return None
+
+    def add(self,
+            position: tuple[float, float], size: tuple[float, float],
+            walk_speed: float = 0, direction: int = -1, turn_at_ledges: bool = True
+        ) -> int:
+        """position is the top left corner, returns the index of the new body"""
+        if self.count == self.capacity:
+            self.grow()
+        index = self.count
+        self.position[index] = position
+        self.size[index] = size
+        self.velocity[index] = 0
+        self.walk_speed[index] = walk_speed
+        self.direction[index] = direction
+        self.turn_at_ledges[index] = turn_at_ledges
+        self.on_ground[index] = False
+        self.wall[index] = 0
+        self.count += 1
+        return index
+
+    def clear(self) -> None:
+        self.count = 0
+        return None
+
+    def get_snapshot_size(self) -> int:
+        return sum(getattr(self, name)[:self.count].nbytes for name in self.state_fields)
+
+    def write_snapshot(self, buffer: bytearray, offset: int) -> None:
+        for name in self.state_fields:
+            array = getattr(self, name)[:self.count]
+            view = np.frombuffer(buffer, dtype=array.dtype, count=array.size, offset=offset)
+            view.reshape(array.shape)[...] = array
+            offset += array.nbytes
+        return None
+
+    def read_snapshot(self, buffer: bytearray, offset: int) -> None:
+        for name in self.state_fields:
+            array = getattr(self, name)[:self.count]
+            array[...] = np.frombuffer(buffer, dtype=array.dtype, count=array.size, offset=offset).reshape(array.shape)
+            offset += array.nbytes
+        return None
+
+    def get_rect(self, index: int) -> pygame.FRect:
+        return pygame.FRect(*self.position[index], *self.size[index])
+
+    def in_area(self, area: pygame.Rect) -> np.ndarray:
+        position, size = self.position[:self.count], self.size[:self.count]
+        return (
+            (position[:, 0] < area.right) & (position[:, 0] + size[:, 0] > area.left)
+            & (position[:, 1] < area.bottom) & (position[:, 1] + size[:, 1] > area.top)
+        )
+
+    def cells(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return (
+            np.floor(ys / self.tileheight).astype(np.intp),
+            np.floor(xs / self.tilewidth).astype(np.intp),
+        )
+
+    def is_solid(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        # The map sides and bottom act as walls, the sky above the map is open
+        height, width = self.solid.shape
+        inside = (rows >= 0) & (rows < height) & (columns >= 0) & (columns < width)
+        solid = (rows >= height) | (columns < 0) | (columns >= width)
+        solid[inside] = self.solid[rows[inside], columns[inside]]
+        return solid
+
+    def get_platform_top(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        height, width = self.platform_top.shape
+        inside = (rows >= 0) & (rows < height) & (columns >= 0) & (columns < width)
+        top = np.full(rows.shape, np.nan)
+        top[inside] = self.platform_top[rows[inside], columns[inside]]
+        return top
+
+    def sample_offsets(self, lengths: np.ndarray, tile_length: float) -> np.ndarray:
+        """Points along an edge no further apart than one tile, shape (bodies, samples)"""
+        samples = max(2, math.ceil(float(lengths.max()) / tile_length) + 1)
+        return (lengths[:, None] - self.epsilon) * np.linspace(0, 1, samples)[None, :]
+
+    def step(self, dt: float, mask: np.ndarray | None = None) -> None:
+        """Advance every body, or only those selected by mask, by dt seconds"""
+        indices = np.arange(self.count) if mask is None else np.flatnonzero(mask)
+        if not len(indices):
+            return None
+        position = self.position[indices]
+        size = self.size[indices]
+        velocity = self.velocity[indices]
+        direction = self.direction[indices].astype(np.float64)
+        walk_speed = self.walk_speed[indices]
+
+        # Horizontal
+        velocity[:, 0] = np.clip(velocity[:, 0] + self.acceleration * dt * direction, -walk_speed, walk_speed)
+        position[:, 0] += velocity[:, 0] * dt
+        wall = self.collide_horizontal(position, size, velocity)
+
+        # Vertical, sliding down a wall is slowed by friction like the player
+        previous_bottom = position[:, 1] + size[:, 1]
+        gravity = np.where((wall != 0) & (velocity[:, 1] > 0), self.gravity - self.wall_friction, self.gravity)
+        velocity[:, 1] += gravity / 2 * dt
+        position[:, 1] += velocity[:, 1] * dt
+        velocity[:, 1] += gravity / 2 * dt
+        on_ground = self.collide_vertical(position, size, velocity, previous_bottom)
+
+        # Patrol: turn around at walls and before walking off a ledge
+        direction = self.direction[indices]
+        direction[wall != 0] = -wall[wall != 0]
+        ledge = on_ground & self.turn_at_ledges[indices] & ~self.has_floor_ahead(position, size, direction)
+        direction[ledge] = -direction[ledge]
+
+        self.position[indices] = position
+        self.velocity[indices] = velocity
+        self.direction[indices] = direction
+        self.wall[indices] = wall
+        self.on_ground[indices] = on_ground
+        return None
+
+    def collide_horizontal(self, position: np.ndarray, size: np.ndarray, velocity: np.ndarray) -> np.ndarray:
+        moving_right = velocity[:, 0] > 0
+        moving = velocity[:, 0] != 0
+        edge = np.where(moving_right, position[:, 0] + size[:, 0] - self.epsilon, position[:, 0])
+        ys = position[:, 1, None] + self.sample_offsets(size[:, 1], self.tileheight)
+        rows, columns = self.cells(np.broadcast_to(edge[:, None], ys.shape), ys)
+        hit = moving & self.is_solid(rows, columns).any(axis=1)
+        column = columns[:, 0]
+        position[:, 0] = np.where(
+            hit & moving_right, column * self.tilewidth - size[:, 0],
+            np.where(hit, (column + 1) * self.tilewidth, position[:, 0])
+        )
+        velocity[hit, 0] = 0
+        return np.where(hit, np.where(moving_right, 1, -1), 0).astype(np.int8)
+
+    def collide_vertical(self,
+            position: np.ndarray, size: np.ndarray, velocity: np.ndarray, previous_bottom: np.ndarray
+        ) -> np.ndarray:
+        falling = velocity[:, 1] > 0
+        edge = np.where(falling, position[:, 1] + size[:, 1] - self.epsilon, position[:, 1])
+        xs = position[:, 0, None] + self.sample_offsets(size[:, 0], self.tilewidth)
+        rows, columns = self.cells(xs, np.broadcast_to(edge[:, None], xs.shape))
+        solid_hit = self.is_solid(rows, columns).any(axis=1)
+        # One-way platforms only stop bodies whose bottom crossed their top during this step
+        top = self.get_platform_top(rows, columns)
+        with np.errstate(invalid='ignore'):
+            crossed = (previous_bottom[:, None] <= top) & (position[:, 1, None] + size[:, 1, None] > top)
+        platform_hit = falling & crossed.any(axis=1)
+        platform_top = np.where(crossed, top, np.inf).min(axis=1)
+
+        row = rows[:, 0]
+        landed = falling & (solid_hit | platform_hit)
+        bottom = np.where(solid_hit, row * self.tileheight, np.inf)
+        bottom = np.minimum(bottom, np.where(platform_hit, platform_top, np.inf))
+        position[:, 1] = np.where(landed, bottom - size[:, 1], position[:, 1])
+        bumped = ~falling & (velocity[:, 1] < 0) & solid_hit
+        position[:, 1] = np.where(bumped, (row + 1) * self.tileheight, position[:, 1])
+        velocity[landed | bumped, 1] = 0
+        return landed
+
+    def has_floor_ahead(self, position: np.ndarray, size: np.ndarray, direction: np.ndarray) -> np.ndarray:
+        x = np.where(direction > 0, position[:, 0] + size[:, 0] + self.epsilon, position[:, 0] - self.epsilon)
+        bottom = position[:, 1] + size[:, 1]
+        rows, columns = self.cells(x, bottom + self.epsilon)
+        top = self.get_platform_top(rows, columns)
+        with np.errstate(invalid='ignore'):
+            on_platform = np.abs(top - bottom) < 1
+        return self.is_solid(rows, columns) | on_platform
@@ -0,0 +1,116 @@
+import csv
+import json
+
+from collections import deque
+from pathlib import Path
+from time import perf_counter
+
+import pygame
+
+
+class Profiler:
+    """
+    Rolling per-phase timings. While disabled, start() and stop() return right
+    after one attribute check, so the hooks can stay in the hot paths.
+    """
+
+    # Samples kept per phase and trace events kept for export
+    history = 240
+    trace_history = 20000
+    overlay_font_size = 18
+    overlay_padding = 6
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.samples = {}
+        self.starts = {}
+        self.trace = deque(maxlen=self.trace_history)
+        self.origin = perf_counter()
+        self.font = None
+        return None
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+        return None
+
+    def clear(self) -> None:
+        self.samples.clear()
+        self.starts.clear()
+        self.trace.clear()
+        return None
+
+    def start(self, name: str) -> None:
+        if not self.enabled:
+            return None
+        self.starts[name] = perf_counter()
+        return None
+
+    def stop(self, name: str) -> None:
+        if not self.enabled:
+            return None
+        end = perf_counter()
+        begin = self.starts.pop(name, None)
+        if begin is None:
+            return None
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.history)
+        self.samples[name].append(end - begin)
+        self.trace.append((name, begin, end - begin))
+        return None
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        """Mean, last and max duration per phase in milliseconds"""
+        return {
+            name: {
+                'mean': sum(samples) / len(samples) * 1000,
+                'last': samples[-1] * 1000,
+                'max': max(samples) * 1000,
+            }
+            for name, samples in self.samples.items() if samples
+        }
+
+    def export_csv(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['phase', 'start_ms', 'duration_ms'])
+            for name, begin, duration in self.trace:
+                writer.writerow([name, f'{(begin - self.origin) * 1000:.4f}', f'{duration * 1000:.4f}'])
+        return None
+
+    def export_chrome_trace(self, path: Path) -> None:
+        """Complete events in the Trace Event Format, open with chrome://tracing or Perfetto"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        events = [
+            {
+                'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                'ts': (begin - self.origin) * 1e6, 'dur': duration * 1e6,
+            }
+            for name, begin, duration in self.trace
+        ]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return None
+
+    def draw_overlay(self, screen: pygame.Surface) -> pygame.Rect:
+        """Draw the stats table in the top left corner, returns the area covered"""
+        if self.font is None:
+            self.font = pygame.font.SysFont('dejavusansmono,couriernew,monospace', self.overlay_font_size)
+        lines = [f'{"phase":<16}{"mean":>8}{"last":>8}{"max":>8}']
+        lines += [
+            f'{name:<16}{stats["mean"]:>8.3f}{stats["last"]:>8.3f}{stats["max"]:>8.3f}'
+            for name, stats in self.get_stats().items()
+        ]
+        rendered = [self.font.render(line, True, 'white') for line in lines]
+        line_height = self.font.get_linesize()
+        width = max(surface.get_width() for surface in rendered) + 2 * self.overlay_padding
+        height = line_height * len(rendered) + 2 * self.overlay_padding
+        area = pygame.Rect(0, 0, width, height)
+        screen.fill((0, 0, 0), area)
+        screen.blits([
+            (surface, (self.overlay_padding, self.overlay_padding + index * line_height))
+            for index, surface in enumerate(rendered)
+        ], doreturn=False)
+        return area
@@ -0,0 +1,38 @@
+import pygame
+
+from ..enums import RenderLayer
+
+
+class RenderQueue:
+    """Collects (surface, position) pairs for a frame and submits them in a single blits call"""
+
+    def __init__(self) -> None:
+        self.layers = {layer: [] for layer in sorted(RenderLayer, key=lambda layer: layer.value)}
+        # Blits submitted by the last flush
+        self.blit_count = 0
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.layers.values())
+
+    def add(self, layer: RenderLayer, surface: pygame.Surface, position: tuple[float, float]) -> None:
+        self.layers[layer].append((surface, position))
+        return None
+
+    def extend(self, layer: RenderLayer, entries: list[tuple[pygame.Surface, tuple[float, float]]]) -> None:
+        self.layers[layer].extend(entries)
+        return None
+
+    def clear(self) -> None:
+        for entries in self.layers.values():
+            entries.clear()
+        return None
+
+    def flush(self, screen: pygame.Surface) -> None:
+        sequence = []
+        for entries in self.layers.values():
+            sequence.extend(entries)
+        screen.blits(sequence, doreturn=False)
+        self.blit_count = len(sequence)
+        self.clear()
+        return None
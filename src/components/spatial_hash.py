@@ -0,0 +1,87 @@
+import pygame
+
+
+class SpatialHash:
+
+    def __init__(self, cell_width: float, cell_height: float) -> None:
+        assert cell_width > 0
+        assert cell_height > 0
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.cells = {}
+        # Object -> (insertion order, covered cell range)
+        self.entries = {}
+        self.counter = 0
+        return None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, obj: object) -> bool:
+        return obj in self.entries
+
+    def cell_range(self, rect: pygame.FRect) -> tuple[int, int, int, int]:
+        return (
+            int(rect.left // self.cell_width),
+            int(rect.top // self.cell_height),
+            int(rect.right // self.cell_width),
+            int(rect.bottom // self.cell_height),
+        )
+
+    def clear(self) -> None:
+        self.cells.clear()
+        self.entries.clear()
+        self.counter = 0
+        return None
+
+    def insert(self, obj: object) -> None:
+        assert obj not in self.entries
+        cell_range = self.cell_range(obj.rect)
+        self.entries[obj] = (self.counter, cell_range)
+        self.counter += 1
+        self.add_to_cells(obj, cell_range)
+        return None
+
+    def remove(self, obj: object) -> None:
+        _, cell_range = self.entries.pop(obj)
+        self.remove_from_cells(obj, cell_range)
+        return None
+
+    def move(self, obj: object) -> None:
+        """Re-bucket an object after its rect changed"""
+        order, old_range = self.entries[obj]
+        new_range = self.cell_range(obj.rect)
+        if new_range == old_range:
+            return None
+        self.remove_from_cells(obj, old_range)
+        self.add_to_cells(obj, new_range)
+        self.entries[obj] = (order, new_range)
+        return None
+
+    def add_to_cells(self, obj: object, cell_range: tuple[int, int, int, int]) -> None:
+        left, top, right, bottom = cell_range
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                self.cells.setdefault((x, y), []).append(obj)
+        return None
+
+    def remove_from_cells(self, obj: object, cell_range: tuple[int, int, int, int]) -> None:
+        left, top, right, bottom = cell_range
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                bucket = self.cells[(x, y)]
+                bucket.remove(obj)
+                if not bucket:
+                    del self.cells[(x, y)]
+        return None
+
+    def query(self, rect: pygame.FRect) -> list[object]:
+        """Objects whose cells overlap rect, in insertion order"""
+        left, top, right, bottom = self.cell_range(rect)
+        found = set()
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                bucket = self.cells.get((x, y))
+                if bucket:
+                    found.update(bucket)
+        return sorted(found, key=lambda obj: self.entries[obj][0])
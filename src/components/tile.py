@@ -1,7 +1,10 @@
+import struct
+
 from pathlib import Path
 
 import pygame
 
+from .animation import AnimationClock
 from .character import Character
 
 from ..enums import (
@@ -31,16 +34,10 @@ class Tile(pygame.sprite.Sprite):
         raise NotImplementedError('Not implemented')
 
 
-class Terrain(Tile):
+class TerrainCollision:
+    """Solid collision response shared by the terrain blocks"""
 
-    def __init__(self,
-            position: tuple[float, float],
-            surface: pygame.Surface,
-            slidable: bool = False
-        ) -> None:
-        super().__init__(position, surface)
-        self.slidable = slidable
-        return None
+    __slots__ = ()
 
     def handle_player_collision(self, player: Character, axis: Axis) -> None:
         if axis == Axis.Horizontal:
@@ -69,16 +66,22 @@ class Terrain(Tile):
             return False
 
 
-class Platform(Tile):
+class TerrainBlock(TerrainCollision):
+    """Collision only rectangle covering one or several terrain cells, never drawn"""
 
-    def __init__(self,
-            position: tuple[float, float],
-            surface: pygame.Surface,
-            rect_orientation: str
-        ) -> None:
-        super().__init__(position, surface, rect_orientation)
+    __slots__ = ('rect', 'slidable')
+
+    def __init__(self, rect: pygame.FRect, slidable: bool = False) -> None:
+        self.rect = rect
+        self.slidable = slidable
         return None
 
+
+class PlatformCollision:
+    """One-way collision response shared by platform sprites and static platform blocks"""
+
+    __slots__ = ()
+
     def handle_player_collision(self, player: Character, axis: Axis) -> None:
         if player.skip_platform:
             return None
@@ -100,20 +103,46 @@ class Platform(Tile):
         return False
 
 
+class PlatformBlock(PlatformCollision):
+    """Collision only rectangle of a run of static platform cells, never drawn"""
+
+    __slots__ = ('rect',)
+
+    def __init__(self, rect: pygame.FRect) -> None:
+        self.rect = rect
+        return None
+
+
+class Platform(PlatformCollision, Tile):
+
+    def __init__(self,
+            position: tuple[float, float],
+            surface: pygame.Surface,
+            rect_orientation: str
+        ) -> None:
+        super().__init__(position, surface, rect_orientation)
+        return None
+
+
 class FallingPlatform(Platform):
 
     animation_speed = 10
     image_size = (64, 20)
+    # Status index and position
+    snapshot_format = struct.Struct('<bdd')
+    statuses = list(PlatformStatus)
+
     def __init__(self,
             position: tuple[float, float],
-            images: list[pygame.Surface],
+            animations: AnimationClock,
             rect_orientation: str
         ):
-        self.images = images
-        self.frame = 0
+        # Clips are named after the statuses
+        self.animations = animations
         self.status = PlatformStatus.On
-        surface = self.images[self.status][0]
+        surface = self.animations.clips[self.status].frames[0]
         super().__init__(position, surface, rect_orientation)
+        self.animations.subscribe(self, self.status)
         self.dust = pygame.sprite.Group()
         return None
 
@@ -129,8 +158,14 @@ class FallingPlatform(Platform):
         }
         return images
 
-    def update(self, dt):
-        self.frame += self.animation_speed * dt
-        frame_index = int(self.frame) % len(self.images)
-        self.image = self.images[self.status][frame_index]
+    def write_snapshot(self, buffer: bytearray, offset: int) -> None:
+        self.snapshot_format.pack_into(buffer, offset, self.statuses.index(self.status), *self.rect.topleft)
+        return None
+
+    def read_snapshot(self, buffer: bytearray, offset: int) -> None:
+        """The owner re-buckets the platform in its tile index afterwards"""
+        status, x, y = self.snapshot_format.unpack_from(buffer, offset)
+        self.status = self.statuses[status]
+        self.rect.topleft = (x, y)
+        self.animations.subscribe(self, self.status)
         return None
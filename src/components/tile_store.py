@@ -0,0 +1,176 @@
+import numpy as np
+import pygame
+import pytmx
+
+from .collision_mesh import CollisionMesh
+from .map_cache import CompiledTileLayer
+from .tile import (
+    PlatformBlock,
+    TerrainBlock
+)
+
+
+class StoredTileLayer:
+
+    def __init__(self, name: str, ids: np.ndarray, images: list[pygame.Surface | None], flags: int) -> None:
+        self.name = name
+        # (height, width) indices into images, 0 is an empty cell
+        self.ids = ids
+        self.images = images
+        self.flags = flags
+        # Image height per index, platforms are anchored at the bottom of their cell
+        self.heights = np.array([image.get_height() if image is not None else 0 for image in images])
+        return None
+
+
+class TileStore:
+    """
+    The static tiles of a level kept as grids instead of one sprite per tile: per
+    layer a 2D array of indices into the layer's images, and one flag grid for the
+    whole map. Drawing, colliders and the enemy physics grid are read from them.
+    """
+
+    # Cell flags, a cell gets the flags of every layer with a tile in it
+    Solid = 1
+    Slidable = 2
+    OneWay = 4
+
+    def __init__(self, width: int, height: int, tilewidth: int, tileheight: int) -> None:
+        self.size = (width, height)
+        self.tilewidth = tilewidth
+        self.tileheight = tileheight
+        self.layers = []
+        self.flags = np.zeros((height, width), dtype=np.uint8)
+        self.count = 0
+        return None
+
+    def __len__(self) -> int:
+        return self.count
+
+    @classmethod
+    def get_layer_flags(cls, name: str) -> int:
+        if 'terrain' in name:
+            return cls.Solid | (cls.Slidable if 'slidable' in name else 0)
+        if name == 'static_platform':
+            return cls.OneWay
+        return 0
+
+    @classmethod
+    def from_map_data(cls, map_data) -> 'TileStore':
+        """Store the terrain and static platform layers of a pytmx or compiled map"""
+        store = cls(map_data.width, map_data.height, map_data.tilewidth, map_data.tileheight)
+        for layer in map_data.layers:
+            flags = cls.get_layer_flags(layer.name)
+            if not flags or not isinstance(layer, (CompiledTileLayer, pytmx.TiledTileLayer)):
+                continue
+            store.add_layer(layer.name, *cls.read_layer(layer), flags)
+        return store
+
+    @classmethod
+    def read_layer(cls,
+            layer: CompiledTileLayer | pytmx.TiledTileLayer
+        ) -> tuple[np.ndarray, list[pygame.Surface | None]]:
+        if isinstance(layer, CompiledTileLayer):
+            # The compiled grid already holds atlas indices, view it without copying
+            return np.frombuffer(layer.data, dtype=np.uint32).reshape(layer.height, layer.width), layer.images
+        ids = np.zeros((layer.height, layer.width), dtype=np.uint32)
+        images = [None]
+        indices = {}
+        for x, y, surface in layer.tiles():
+            if id(surface) not in indices:
+                indices[id(surface)] = len(images)
+                images.append(surface)
+            ids[y, x] = indices[id(surface)]
+        return ids, images
+
+    def add_layer(self, name: str, ids: np.ndarray, images: list[pygame.Surface | None], flags: int) -> None:
+        assert ids.shape == self.flags.shape
+        occupied = ids != 0
+        self.flags[occupied] |= flags
+        self.count += int(np.count_nonzero(occupied))
+        self.layers.append(StoredTileLayer(name, ids, images, flags))
+        return None
+
+    def get_region(self, area: pygame.Rect | pygame.FRect, margin: int = 0) -> tuple[int, int, int, int]:
+        """Cells (left, top, right, bottom) overlapping area, right and bottom exclusive"""
+        width, height = self.size
+        return (
+            max(0, int(area.left // self.tilewidth) - margin),
+            max(0, int(area.top // self.tileheight) - margin),
+            min(width, int((area.right - 1) // self.tilewidth) + 1 + margin),
+            min(height, int((area.bottom - 1) // self.tileheight) + 1 + margin),
+        )
+
+    def iter_cells(self, layer: StoredTileLayer, region: tuple[int, int, int, int] | None):
+        """Columns, rows and image indices of the tiles in region, row by row"""
+        left, top, right, bottom = region or (0, 0, *self.size)
+        window = layer.ids[top:bottom, left:right]
+        rows, columns = np.nonzero(window)
+        return columns + left, rows + top, window[rows, columns]
+
+    def get_blits(self,
+            region: tuple[int, int, int, int] | None = None, offset: tuple[float, float] = (0, 0)
+        ) -> list[tuple[pygame.Surface, tuple[int, int]]]:
+        """Tiles in region with their position relative to offset, in layer order"""
+        blits = []
+        for layer in self.layers:
+            columns, rows, ids = self.iter_cells(layer, region)
+            xs = columns * self.tilewidth - int(offset[0])
+            if layer.flags & self.OneWay:
+                ys = (rows + 1) * self.tileheight - layer.heights[ids] - int(offset[1])
+            else:
+                ys = rows * self.tileheight - int(offset[1])
+            images = layer.images
+            blits += [(images[index], (x, y)) for index, x, y in zip(ids.tolist(), xs.tolist(), ys.tolist())]
+        return blits
+
+    def get_colliders(self,
+            merge: bool, region: tuple[int, int, int, int] | None = None
+        ) -> list[TerrainBlock | PlatformBlock]:
+        """
+        Colliders of the tiles in region. Merged, terrain becomes the fewest rectangles
+        covering it and neighbouring platforms of the same height become one block.
+        """
+        tilewidth, tileheight = self.tilewidth, self.tileheight
+        solid_cells = {False: set(), True: set()}
+        cell_colliders = []
+        platforms = []
+        for layer in self.layers:
+            columns, rows, ids = self.iter_cells(layer, region)
+            if layer.flags & self.OneWay:
+                run = None
+                for x, y, index in zip(columns.tolist(), rows.tolist(), ids.tolist()):
+                    width, height = layer.images[index].get_size()
+                    rect = pygame.FRect(x * tilewidth, (y + 1) * tileheight - height, width, height)
+                    if not merge:
+                        cell_colliders.append(PlatformBlock(rect))
+                    elif (
+                        run is not None and run.rect.right == rect.left and run.rect.top == rect.top
+                        and run.rect.height == height
+                    ):
+                        run.rect.width += width
+                    else:
+                        run = PlatformBlock(rect)
+                        platforms.append(run)
+            else:
+                slidable = bool(layer.flags & self.Slidable)
+                if merge:
+                    solid_cells[slidable].update(zip(columns.tolist(), rows.tolist()))
+                    continue
+                for x, y, index in zip(columns.tolist(), rows.tolist(), ids.tolist()):
+                    size = layer.images[index].get_size()
+                    cell_colliders.append(TerrainBlock(pygame.FRect((x * tilewidth, y * tileheight), size), slidable))
+        if not merge:
+            return cell_colliders
+        return CollisionMesh.build(solid_cells, tilewidth, tileheight) + platforms
+
+    def get_physics_grid(self) -> tuple[np.ndarray, np.ndarray]:
+        """Solid cells and one-way platform tops of the whole map"""
+        solid = (self.flags & self.Solid) != 0
+        platform_top = np.full(self.flags.shape, np.nan)
+        rows = np.arange(self.size[1])[:, None]
+        for layer in self.layers:
+            if layer.flags & self.OneWay:
+                tops = (rows + 1) * self.tileheight - layer.heights[layer.ids]
+                platform_top = np.where(layer.ids != 0, tops, platform_top)
+        return solid, platform_top
@@ -0,0 +1,92 @@
+import pygame
+
+from .chunked_layer import ChunkedLayer
+from .spatial_hash import SpatialHash
+from .tile_store import TileStore
+
+
+class TileStream:
+    """
+    Colliders and baked chunks of a level's static tiles, only built near the
+    camera from the TileStore grids. Chunks stay resident after leaving the wanted
+    area until more than max_chunks are loaded, then the farthest ones go first.
+    Chunks in the wanted area are never evicted, so the ceiling can be exceeded
+    when the radius asks for more.
+    """
+
+    def __init__(self,
+            tile_store: TileStore, chunk_tiles: tuple[int, int], radius: int, max_chunks: int,
+            merge_collision_geometry: bool, tile_index: SpatialHash, static_layer: ChunkedLayer | None
+        ) -> None:
+        assert radius >= 0 and max_chunks > 0
+        self.tile_store = tile_store
+        tilewidth, tileheight = tile_store.tilewidth, tile_store.tileheight
+        self.chunk_tiles = chunk_tiles
+        self.chunk_pixels = (chunk_tiles[0] * tilewidth, chunk_tiles[1] * tileheight)
+        width, height = tile_store.size
+        self.size = (width, height)
+        self.chunk_count = (-(-width // chunk_tiles[0]), -(-height // chunk_tiles[1]))
+        self.radius = radius
+        self.max_chunks = max_chunks
+        self.merge_collision_geometry = merge_collision_geometry
+        self.tile_index = tile_index
+        self.static_layer = static_layer
+        # key -> colliders of the materialized chunks
+        self.chunks = {}
+        self.wanted = None
+        return None
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def get_wanted_range(self, area: pygame.Rect | pygame.FRect) -> tuple[range, range]:
+        chunk_width, chunk_height = self.chunk_pixels
+        return (
+            range(
+                max(0, int(area.left // chunk_width) - self.radius),
+                min(self.chunk_count[0], int((area.right - 1) // chunk_width) + 1 + self.radius),
+            ),
+            range(
+                max(0, int(area.top // chunk_height) - self.radius),
+                min(self.chunk_count[1], int((area.bottom - 1) // chunk_height) + 1 + self.radius),
+            ),
+        )
+
+    def update(self, area: pygame.Rect | pygame.FRect) -> bool:
+        """Load the chunks around area and evict over the ceiling, True if anything changed"""
+        cols, rows = self.get_wanted_range(area)
+        if (cols, rows) == self.wanted:
+            return False
+        self.wanted = (cols, rows)
+        center = (area.centerx / self.chunk_pixels[0], area.centery / self.chunk_pixels[1])
+        def distance(key: tuple[int, int]) -> float:
+            return (key[0] + 0.5 - center[0]) ** 2 + (key[1] + 0.5 - center[1]) ** 2
+        changed = False
+        missing = [(col, row) for col in cols for row in rows if (col, row) not in self.chunks]
+        for key in sorted(missing, key=distance):
+            self.materialize(key)
+            changed = True
+        if len(self.chunks) > self.max_chunks:
+            outside = [key for key in self.chunks if key[0] not in cols or key[1] not in rows]
+            for key in sorted(outside, key=distance, reverse=True)[:len(self.chunks) - self.max_chunks]:
+                self.evict(key)
+                changed = True
+        return changed
+
+    def materialize(self, key: tuple[int, int]) -> None:
+        x0, y0 = key[0] * self.chunk_tiles[0], key[1] * self.chunk_tiles[1]
+        region = (x0, y0, min(x0 + self.chunk_tiles[0], self.size[0]), min(y0 + self.chunk_tiles[1], self.size[1]))
+        colliders = self.tile_store.get_colliders(self.merge_collision_geometry, region)
+        for collider in colliders:
+            self.tile_index.insert(collider)
+        if self.static_layer is not None:
+            self.static_layer.bake_chunk(key, self.tile_store.get_blits(region))
+        self.chunks[key] = colliders
+        return None
+
+    def evict(self, key: tuple[int, int]) -> None:
+        for collider in self.chunks.pop(key):
+            self.tile_index.remove(collider)
+        if self.static_layer is not None:
+            self.static_layer.drop_chunk(key)
+        return None
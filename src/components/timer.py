@@ -1,35 +1,122 @@
-from pygame.time import get_ticks
+import heapq
+import struct
+
+from itertools import count
+
+
+class TimerService:
+	"""
+	Schedules timers on the simulation clock in milliseconds. Pending expirations
+	sit in a heap, so advancing costs nothing until the earliest one is due.
+	Cancelled entries are dropped lazily when they reach the top.
+	"""
+
+	def __init__(self) -> None:
+		self.time = 0
+		self.heap = []
+		self.sequence = count()
+		return None
+
+	def schedule(self, timer: 'Timer', due: float) -> list:
+		# Same due time fires in scheduling order
+		entry = [due, next(self.sequence), timer]
+		heapq.heappush(self.heap, entry)
+		return entry
+
+	def cancel(self, entry: list) -> None:
+		entry[2] = None
+		return None
+
+	def advance(self, milliseconds: float) -> None:
+		self.time += milliseconds
+		heap = self.heap
+		while heap and heap[0][0] <= self.time:
+			due, _, timer = heapq.heappop(heap)
+			if timer is not None:
+				timer.expire(due)
+		return None
+
+	def clear(self) -> None:
+		self.heap.clear()
+		return None
+
+
+# Timers created without a service run on this one, maps keep their own
+TimerService.default = TimerService()
+
 
 class Timer:
+
+	# A repeat is due at least this long after the advance that fired it, in milliseconds
+	min_repeat_delay = 1e-6
+
 	def __init__(self,
             duration: float,
 			func = None,
-			repeat: bool = False
+			repeat: bool = False,
+			service: TimerService | None = None
 		) -> None:
+		if repeat and duration <= 0:
+			raise ValueError(f'A repeating timer needs a positive duration, got {duration}')
 		self.duration = duration
 		self.func = func
 		self.start_time = 0
 		self.active = False
 		self.repeat = repeat
+		self.service = TimerService.default if service is None else service
+		self.entry = None
 
 	def activate(self) -> None:
+		self.start(self.service.time)
+		return None
+
+	def start(self, start_time: float) -> None:
+		if self.entry is not None:
+			self.service.cancel(self.entry)
 		self.active = True
-		self.start_time = get_ticks()
+		self.start_time = start_time
+		self.entry = self.service.schedule(self, start_time + self.duration)
 		return None
 
 	def deactivate(self):
+		if self.entry is not None:
+			self.service.cancel(self.entry)
+			self.entry = None
 		self.active = False
 		self.start_time = 0
 		if self.repeat:
 			self.activate()
 		return None
 
+	def expire(self, due: float) -> None:
+		self.entry = None
+		self.active = False
+		if self.repeat:
+			# Restart from the due time rather than now, so repeats don't drift, but
+			# never due again within the advance that fired it
+			self.start(max(due, self.service.time + self.min_repeat_delay - self.duration))
+		if self.func:
+			self.func()
+		return None
+
+	# Active flag and remaining milliseconds
+	snapshot_format = struct.Struct('<?d')
+
+	def write_snapshot(self, buffer: bytearray, offset: int) -> None:
+		remaining = self.entry[0] - self.service.time if self.entry is not None else 0
+		self.snapshot_format.pack_into(buffer, offset, self.active, remaining)
+		return None
+
+	def read_snapshot(self, buffer: bytearray, offset: int) -> None:
+		active, remaining = self.snapshot_format.unpack_from(buffer, offset)
+		if self.entry is not None:
+			self.service.cancel(self.entry)
+			self.entry = None
+		self.active = False
+		if active:
+			self.start(self.service.time + remaining - self.duration)
+		return None
+
 	def update(self):
-		if not self.active:
-			return None
-		current_time = get_ticks()
-		if current_time - self.start_time >= self.duration:
-			if self.func and self.start_time != 0:
-				self.func()
-			self.deactivate()
+		"""Kept for existing owners, expiry is driven by TimerService.advance"""
 		return None
@@ -35,6 +35,11 @@ class CharacterStatus(Enum):
     Run = 'run'
     WallSlide = 'wall_slide'
 
+class CheckpointStatus(Enum):
+    NoFlag = 'idle_without_flag'
+    FlagOut = 'flag_out'
+    Flag = 'idle_with_flag'
+
 class Direction(Enum):
     Left = auto()
     Right = auto()
@@ -46,6 +51,20 @@ class EffectName(Enum):
     Collected = 'collected'
     Disappearing = 'disappearing'
 
+class EnemyName(Enum):
+    AngryPig = 'angry_pig'
+    BigRock = 'big_rock'
+    Bunny = 'bunny'
+    Chameleon = 'chameleon'
+    Chicken = 'chicken'
+    MediumRock = 'medium-rock'
+    Mushroom = 'mushroom'
+    Radish = 'radish'
+    Rino = 'rino'
+    SmallRock = 'small_rock'
+    Snail = 'snail'
+    Trunk = 'trunk'
+
 class FruitName(Enum):
     Apple = 'apple'
     Bananas = 'bananas'
@@ -65,3 +84,25 @@ class ParticleName(Enum):
 class PlatformStatus(Enum):
     On = 'on'
     Off = 'off'
+
+class RenderLayer(Enum):
+    Background = 0
+    StaticTiles = 1
+    DynamicTiles = 2
+    Enemies = 3
+    Particles = 4
+    Player = 5
+    Items = 6
+
+class SoundEffect(Enum):
+    Appear = 'appear'
+    BlockBreak = 'block_break'
+    Blow = 'blow'
+    Cancel = 'cancel'
+    Confirm = 'confirm'
+    EnemyHit = 'enemy_hit'
+    FruitCollect = 'fruit_collect'
+    Jump = 'jump'
+    PlayerHit = 'player_hit'
+    Select = 'select'
+    Win = 'win'
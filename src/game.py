@@ -1,6 +1,12 @@
+import os
 import random
 import sys
+import time
 
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor
+)
 from pathlib import Path
 
 import pygame
@@ -10,9 +16,16 @@ from .components import (
     Character,
     Map
 )
+from .components.assets import AssetRegistry
+from .components.audio import AudioManager
 from .enums import (
     BackgroundName,
-    CharacterName
+    CharacterName,
+    CharacterStatus
+)
+from .replay import (
+    InputRecorder,
+    ReplayDriver
 )
 
 
@@ -22,40 +35,212 @@ class Game:
     game_name = "Pixel adventure"
     start_map = "data/maps/map_01.tmx"
     screen_size = (1024, 576)
+    fixed_dt = 1 / 120
+    # Scheduler: physics at fixed_dt, rendering capped at max_frame_rate and interpolated in between
+    fixed_timestep = True
+    max_frame_rate = 60
+    # Longest frame fed to the accumulator, so a stall doesn't trigger a burst of catch-up ticks
+    max_frame_time = 0.25
+    input_keys = (pygame.K_a, pygame.K_d, pygame.K_s, pygame.K_w, pygame.K_r)
+    # F3 toggles the profiler overlay, F4 exports the collected timings
+    profiler_toggle_key = pygame.K_F3
+    profiler_export_key = pygame.K_F4
+    profile_dir = '.cache/profiles'
 
-    def __init__(self) -> None:
+    def __init__(self, headless: bool = False, dirty_rendering: bool = False, seed: int | None = None) -> None:
+        self.headless = headless
+        # Only push changed regions to the display, for targets where uploads are expensive
+        self.dirty_rendering = dirty_rendering
+        if self.headless:
+            # The dummy driver still gives convert_alpha() a display surface to match
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            # Headless runs are silent, don't hold the audio device
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        else:
+            AudioManager.pre_init()
+        # Every random choice derives from the seed, so a recording can rebuild the same session
+        self.seed = random.getrandbits(64) if seed is None else seed
+        random.seed(self.seed)
+        self.tick = 0
+        self.recorder = None
+        # Recording whose inputs replace the player's, see start_replay()
+        self.replay = None
         pygame.init()
         self.root_path = Path(__file__).absolute().parents[1]
         self.screen = pygame.display.set_mode(self.screen_size)
         pygame.display.set_caption(self.game_name)
         self.clock = pygame.time.Clock()
+        self.audio = AudioManager(self.root_path, enabled=not self.headless)
         character_images = Character.load_images(self.root_path, random.choice(list(CharacterName)))
+        character_images.preload(CharacterStatus)
         background_image = Background.load_images(self.root_path, random.choice(list(BackgroundName)))
         player = Character(character_images)
         background = Background(background_image)
-        self.map = Map(self.root_path)
+        self.map = Map(self.root_path, self.screen_size)
+        self.profiler = self.map.profiler
+        self.map.audio = self.audio
         self.map.setup(self.start_map, player, background)
+        self.map.scroll_background = not self.dirty_rendering
+        self.map_path = self.start_map
+        # Next levels are parsed and built here while the current one keeps playing
+        self.map_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='map-loader')
+        self.preloaded_maps = {}
+        self.audio.play_music()
+        return None
+
+    def preload_map(self, map_data_path: str) -> Future:
+        """Start building a map in the background, change_map() then only has to swap it in"""
+        if map_data_path not in self.preloaded_maps:
+            # Drawn on the main thread so fruit picks only depend on the seed, not on worker timing
+            rng = random.Random(random.getrandbits(64))
+            self.preloaded_maps[map_data_path] = self.map_loader.submit(
+                self.build_map, map_data_path, self.map.objects_images, self.map.background, rng
+            )
+        return self.preloaded_maps[map_data_path]
+
+    def build_map(self,
+            map_data_path: str, objects_images: AssetRegistry, background: Background, rng: random.Random
+        ) -> Map:
+        next_map = Map(self.root_path, self.screen_size, objects_images)
+        next_map.prepare(map_data_path, background, rng)
+        return next_map
+
+    def change_map(self, map_data_path: str) -> None:
+        # Waits only if the map was not preloaded or is still being built
+        next_map = self.preload_map(map_data_path).result()
+        del self.preloaded_maps[map_data_path]
+        # Recordings describe a single map, they end at the transition
+        self.stop_recording()
+        next_map.profiler = self.profiler
+        next_map.audio = self.audio
+        next_map.scroll_background = self.map.scroll_background
+        next_map.enter(self.map.player)
+        self.map = next_map
+        self.map_path = map_data_path
+        return None
+
+    def start_recording(self, path: Path) -> None:
+        assert self.tick == 0, 'Recordings must start before the first tick'
+        # Recordings store a single dt, variable frame times would not replay
+        assert self.fixed_timestep or self.headless, 'Recordings need a fixed timestep'
+        self.recorder = InputRecorder(open(path, 'wb'), self.seed, self.fixed_dt, self.start_map)
+        return None
+
+    def start_replay(self, driver: ReplayDriver) -> None:
+        """Play a recording on screen, the game must be built with its seed"""
+        assert self.tick == 0, 'Replays must start before the first tick'
+        assert self.seed == driver.seed, 'Replays must run on a game built with the recording seed'
+        self.replay = driver
+        self.fixed_dt = driver.fixed_dt
         return None
 
-    def change_map(self) -> None:
+    def stop_recording(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close(self.tick)
+            self.recorder = None
         return None
 
     def quit(self) -> None:
+        self.stop_recording()
+        self.map_loader.shutdown(wait=False, cancel_futures=True)
         pygame.quit()
         sys.exit()
         return None
 
+    def handle_event(self, event: pygame.event.Event) -> None:
+        if event.type == pygame.QUIT: self.quit()
+        if event.type in [pygame.KEYDOWN, pygame.KEYUP]:
+            if event.key == pygame.K_ESCAPE: self.quit()
+            if event.type == pygame.KEYDOWN and event.key == self.profiler_toggle_key:
+                self.toggle_profiler()
+            if event.type == pygame.KEYDOWN and event.key == self.profiler_export_key:
+                self.export_profile()
+            if event.key in self.input_keys and self.replay is None:
+                if self.recorder is not None:
+                    self.recorder.record_event(self.tick, event)
+                self.map.handle_input_event(event)
+        return None
+
+    def toggle_profiler(self) -> None:
+        self.profiler.toggle()
+        self.profiler.clear()
+        # The overlay area is not part of the dirty renderer's backdrop
+        self.map.dirty_renderer.invalidate()
+        return None
+
+    def export_profile(self) -> None:
+        name = time.strftime('profile-%Y%m%d-%H%M%S')
+        self.profiler.export_csv(self.root_path / self.profile_dir / f'{name}.csv')
+        self.profiler.export_chrome_trace(self.root_path / self.profile_dir / f'{name}.json')
+        return None
+
+    def update(self, dt: float) -> None:
+        if self.replay is not None:
+            # The last frame stays up once the recording ended
+            if self.tick >= self.replay.length:
+                return None
+            for event in self.replay.events.get(self.tick, ()):
+                self.map.handle_input_event(event)
+        self.map.update(dt)
+        self.tick += 1
+        if self.recorder is not None:
+            self.recorder.on_tick(self.tick, self.map)
+        if self.replay is not None:
+            self.replay.verify(self)
+        return None
+
+    def step(self, events: list[pygame.event.Event] = (), dt: float | None = None) -> dict:
+        """Advance the simulation one fixed tick without rendering"""
+        for event in events:
+            self.handle_event(event)
+        self.update(self.fixed_dt if dt is None else dt)
+        return self.map.player.get_state()
+
+    def simulate(self, frames: int, inputs: dict[int, list[pygame.event.Event]] | None = None) -> dict:
+        """Run frames ticks as fast as possible, inputs maps a tick index to its events"""
+        state = self.map.player.get_state()
+        for frame in range(frames):
+            state = self.step(inputs.get(frame, ()) if inputs else ())
+        return state
+
     def run(self) -> None:
+        accumulator = 0
+        profiler = self.profiler
         while 1:
-            dt = self.clock.tick() / 1000
+            # Headless runs draw nothing, so ticks run as fast as they can
+            frame_rate = 0 if self.headless else self.max_frame_rate
+            frame_time = min(self.clock.tick(frame_rate) / 1000, self.max_frame_time)
+            profiler.start('events')
             for event in pygame.event.get():
-                if event.type == pygame.QUIT: self.quit()
-                if event.type in [pygame.KEYDOWN, pygame.KEYUP]:
-                    if event.key == pygame.K_ESCAPE: self.quit()
-                    if event.key in [pygame.K_a, pygame.K_d, pygame.K_s, pygame.K_w]:
-                        self.map.handle_input_event(event)
-            self.screen.fill('black')
-            self.map.update(dt)
-            self.map.draw(self.screen)
-            pygame.display.update()
+                self.handle_event(event)
+            profiler.stop('events')
+            if self.headless:
+                self.update(self.fixed_dt)
+                continue
+            alpha = 1
+            profiler.start('update')
+            if self.fixed_timestep:
+                accumulator += frame_time
+                while accumulator >= self.fixed_dt:
+                    self.update(self.fixed_dt)
+                    accumulator -= self.fixed_dt
+                alpha = accumulator / self.fixed_dt
+            else:
+                self.update(frame_time)
+            profiler.stop('update')
+            profiler.start('draw')
+            if self.dirty_rendering:
+                dirty_rects = self.map.draw_dirty(self.screen, alpha)
+            else:
+                self.screen.fill('black')
+                self.map.draw(self.screen, alpha)
+                dirty_rects = None
+            profiler.stop('draw')
+            if profiler.enabled:
+                overlay = profiler.draw_overlay(self.screen)
+                if dirty_rects is not None:
+                    dirty_rects.append(overlay)
+            profiler.start('display')
+            pygame.display.update(dirty_rects)
+            profiler.stop('display')
         return None
@@ -0,0 +1,202 @@
+import hashlib
+import struct
+import sys
+import time
+
+from pathlib import Path
+from typing import BinaryIO
+
+import pygame
+
+
+class ReplayDivergenceError(Exception):
+
+    def __init__(self, tick: int, expected: bytes, actual: bytes) -> None:
+        super().__init__(f'Replay diverged at tick {tick}: expected {expected.hex()}, got {actual.hex()}')
+        self.tick = tick
+        self.expected = expected
+        self.actual = actual
+        return None
+
+
+class ReplayFormat:
+    """
+    Header: magic, version, seed, fixed dt and the start map. It is followed by
+    records that all begin with (kind, tick):
+      - Key: event type (0 keydown, 1 keyup) and key code
+      - Checkpoint: 8-byte state hash taken after the tick
+      - End: total number of ticks
+    """
+
+    magic = b'CHRP'
+    version = 1
+    header = struct.Struct('<4sHQdH')
+    record = struct.Struct('<BI')
+    key = struct.Struct('<BH')
+    checkpoint = struct.Struct('<8s')
+    # Record kinds
+    Key = 0
+    Checkpoint = 1
+    End = 2
+
+    @classmethod
+    def state_hash(cls, map) -> bytes:
+        player = map.player
+        data = struct.pack(
+            '<6dii?I',
+            *player.hitbox.topleft, *player.velocity, *player.tracking_rect.topleft,
+            player.jump_counter,
+            list(type(player.status)).index(player.status) if player.status is not None else -1,
+            player.wall_jumping,
+            len(map.items),
+        )
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+
+class InputRecorder:
+
+    # Ticks between two state hash checkpoints
+    checkpoint_interval = 120
+
+    def __init__(self, stream: BinaryIO, seed: int, fixed_dt: float, map_path: str) -> None:
+        self.stream = stream
+        map_path = map_path.encode()
+        self.stream.write(ReplayFormat.header.pack(
+            ReplayFormat.magic, ReplayFormat.version, seed, fixed_dt, len(map_path)
+        ))
+        self.stream.write(map_path)
+        self.closed = False
+        return None
+
+    def record_event(self, tick: int, event: pygame.event.Event) -> None:
+        event_type = 0 if event.type == pygame.KEYDOWN else 1
+        self.stream.write(ReplayFormat.record.pack(ReplayFormat.Key, tick))
+        self.stream.write(ReplayFormat.key.pack(event_type, event.key))
+        return None
+
+    def on_tick(self, tick: int, map) -> None:
+        if tick % self.checkpoint_interval == 0:
+            self.stream.write(ReplayFormat.record.pack(ReplayFormat.Checkpoint, tick))
+            self.stream.write(ReplayFormat.checkpoint.pack(ReplayFormat.state_hash(map)))
+        return None
+
+    def close(self, tick: int) -> None:
+        if self.closed:
+            return None
+        self.stream.write(ReplayFormat.record.pack(ReplayFormat.End, tick))
+        self.stream.close()
+        self.closed = True
+        return None
+
+
+class ReplayDriver:
+
+    # Ticks between two map snapshots kept while playing, seek() restores the closest one
+    snapshot_interval = 600
+
+    def __init__(self, stream: BinaryIO) -> None:
+        data = stream.read()
+        magic, version, self.seed, self.fixed_dt, path_size = ReplayFormat.header.unpack_from(data)
+        if magic != ReplayFormat.magic or version != ReplayFormat.version:
+            raise ValueError('Not a replay stream or unsupported version')
+        offset = ReplayFormat.header.size
+        self.map_path = data[offset:offset + path_size].decode()
+        offset += path_size
+        # tick -> events fed before that tick, tick -> expected state hash
+        self.events = {}
+        self.checkpoints = {}
+        self.length = None
+        # tick -> (map, snapshot buffer, checkpoint snapshot copy), filled as the recording plays
+        self.snapshots = {}
+        while offset < len(data):
+            kind, tick = ReplayFormat.record.unpack_from(data, offset)
+            offset += ReplayFormat.record.size
+            if kind == ReplayFormat.Key:
+                event_type, key = ReplayFormat.key.unpack_from(data, offset)
+                offset += ReplayFormat.key.size
+                event = pygame.event.Event(pygame.KEYDOWN if event_type == 0 else pygame.KEYUP, key=key)
+                self.events.setdefault(tick, []).append(event)
+            elif kind == ReplayFormat.Checkpoint:
+                self.checkpoints[tick] = ReplayFormat.checkpoint.unpack_from(data, offset)[0]
+                offset += ReplayFormat.checkpoint.size
+            elif kind == ReplayFormat.End:
+                self.length = tick
+            else:
+                raise ValueError(f'Invalid replay record kind {kind}')
+        if self.length is None:
+            # Truncated recording, e.g. the game crashed; replay up to the last known tick
+            self.length = max([*self.events, *self.checkpoints, 0])
+        return None
+
+    @classmethod
+    def load(cls, path: Path) -> 'ReplayDriver':
+        with open(path, 'rb') as f:
+            return cls(f)
+
+    def create_game(self, headless: bool = True):
+        from .game import Game
+        game = Game(headless=headless, seed=self.seed)
+        if game.start_map != self.map_path:
+            raise ValueError(f'Recording starts on {self.map_path}, the game starts on {game.start_map}')
+        return game
+
+    def play(self, game=None, verify: bool = True):
+        """Feed the recording to a headless game as fast as possible, raising on divergence"""
+        game = game or self.create_game()
+        while game.tick < self.length:
+            self.step(game, verify)
+        return game
+
+    def step(self, game, verify: bool = True) -> None:
+        if game.tick % self.snapshot_interval == 0 and game.tick not in self.snapshots:
+            buffer = game.map.create_snapshot_buffer()
+            game.map.save_snapshot(buffer)
+            # The respawn point is map state too, keep the checkpoint reached by then
+            self.snapshots[game.tick] = (game.map, buffer, bytearray(game.map.checkpoint_snapshot))
+        game.step(self.events.get(game.tick, ()), self.fixed_dt)
+        if verify:
+            self.verify(game)
+        return None
+
+    def verify(self, game) -> None:
+        """Compare the game with the recording's state hash for the tick it just played, if any"""
+        expected = self.checkpoints.get(game.tick)
+        if expected is not None:
+            actual = ReplayFormat.state_hash(game.map)
+            if actual != expected:
+                raise ReplayDivergenceError(game.tick, expected, actual)
+        return None
+
+    def seek(self, game, tick: int, verify: bool = True):
+        """
+        Bring a game to tick, backwards too. The closest snapshot at or before tick is
+        restored instead of replaying from the start, then the recording plays the rest.
+        """
+        if not 0 <= tick <= self.length:
+            raise ValueError(f'Tick {tick} is outside the recording (0 to {self.length})')
+        # Snapshots only apply to the map they were taken on
+        start = max(
+            (snapshot_tick for snapshot_tick, (game_map, *_) in self.snapshots.items()
+             if game_map is game.map and snapshot_tick <= tick),
+            default=None,
+        )
+        if start is not None and (tick < game.tick or start > game.tick):
+            _, buffer, checkpoint = self.snapshots[start]
+            game.map.restore_snapshot(buffer)
+            game.map.checkpoint_snapshot[:] = checkpoint
+            game.tick = start
+        elif tick < game.tick:
+            raise ValueError(f'No snapshot at or before tick {tick} for the current map')
+        while game.tick < tick:
+            self.step(game, verify)
+        return game
+
+
+if __name__ == '__main__':
+    # Replay and time a recording: python -m src.replay path/to/recording
+    driver = ReplayDriver.load(Path(sys.argv[1]))
+    start = time.perf_counter()
+    game = driver.play()
+    elapsed = time.perf_counter() - start
+    print(f'{driver.length} ticks in {elapsed:.3f}s ({driver.length / max(elapsed, 1e-9):.0f} ticks/s), '
+          f'{len(driver.checkpoints)} checkpoints verified')
@@ -1,12 +1,59 @@
 import json
+import threading
 
 from pathlib import Path
 
 import pygame
 
 
+class TextureAtlas:
+
+    page_size = (2048, 2048)
+
+    def __init__(self) -> None:
+        self.pages = []
+        # Shelf packer state per page: [cursor_x, shelf_y, shelf_height]
+        self.shelves = []
+        return None
+
+    def allocate(self, size: tuple[int, int]) -> tuple[int, pygame.Rect]:
+        width, height = size
+        for index, shelf in enumerate(self.shelves):
+            page_width, page_height = self.pages[index].get_size()
+            cursor_x, shelf_y, shelf_height = shelf
+            if cursor_x + width <= page_width and shelf_y + height <= page_height and height <= shelf_height:
+                shelf[0] += width
+                return index, pygame.Rect(cursor_x, shelf_y, width, height)
+            # Open a new shelf below the current one
+            if width <= page_width and shelf_y + shelf_height + height <= page_height:
+                shelf[:] = [width, shelf_y + shelf_height, height]
+                return index, pygame.Rect(0, shelf_y + shelf_height, width, height)
+        # Oversized strips get a page of their own
+        page_size = (max(width, self.page_size[0]), max(height, self.page_size[1]))
+        self.pages.append(pygame.Surface(page_size, pygame.SRCALPHA).convert_alpha())
+        self.shelves.append([width, 0, height])
+        return len(self.pages) - 1, pygame.Rect(0, 0, width, height)
+
+    def add(self, surface: pygame.Surface) -> pygame.Surface:
+        index, rect = self.allocate(surface.get_size())
+        page = self.pages[index]
+        page.blit(surface, rect, special_flags=pygame.BLEND_RGBA_MAX)
+        return page.subsurface(rect)
+
+    def clear(self) -> None:
+        self.pages.clear()
+        self.shelves.clear()
+        return None
+
+
 class Utils:
 
+    atlas = TextureAtlas()
+    # (path, width, height, scale, flip_x) -> frames living in the atlas
+    spritesheet_cache = {}
+    # Assets may be decoded from preload threads
+    spritesheet_lock = threading.Lock()
+
     @classmethod
     def read_json(cls, path: Path) -> dict[str, dict]:
         with open(path, 'r') as f:
@@ -15,21 +62,51 @@ class Utils:
 
     @classmethod
     def read_spritesheet(cls,
-            path: Path, width: int, height: int, scale: int = 1
+            path: Path, width: int, height: int, scale: int = 1, flip_x: bool = False
         ) -> list[pygame.Surface]:
         assert width > 0
         assert height > 0
         assert scale > 0
 
+        key = (str(path), width, height, scale, flip_x)
+        with cls.spritesheet_lock:
+            if key in cls.spritesheet_cache:
+                return list(cls.spritesheet_cache[key])
+        # Decode outside the lock so preload threads can work in parallel
         spritesheets = pygame.image.load(path).convert_alpha()
+        with cls.spritesheet_lock:
+            if key not in cls.spritesheet_cache:
+                cls.spritesheet_cache[key] = cls.slice_spritesheet(spritesheets, width, height, scale, flip_x)
+            return list(cls.spritesheet_cache[key])
+
+    @classmethod
+    def slice_spritesheet(cls,
+            spritesheets: pygame.Surface, width: int, height: int, scale: int, flip_x: bool
+        ) -> list[pygame.Surface]:
         nFrame = spritesheets.get_width() // width
+        if nFrame == 0:
+            return []
 
+        # Pack the whole strip once, frames are subsurfaces of it
+        strip = spritesheets.subsurface((0, 0, width * nFrame, height))
+        if scale > 1:
+            strip = pygame.transform.scale(strip, (width * nFrame * scale, height * scale))
+        if flip_x:
+            strip = pygame.transform.flip(strip, True, False)
+        strip = cls.atlas.add(strip)
+
+        frame_width = width * scale
+        frame_height = height * scale
         surfaceList = []
         for frame in range(nFrame):
-            # pygame.SRCALPHA to invisible background
-            surface = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
-            surface.blit(spritesheets, (0, 0), (width * frame, 0, width, height))
-            if scale > 1:
-                surface = pygame.transform.scale(surface, (width * scale, height * scale))
-            surfaceList.append(surface)
+            # A flipped strip holds its frames in reverse order
+            column = nFrame - 1 - frame if flip_x else frame
+            surfaceList.append(strip.subsurface((column * frame_width, 0, frame_width, frame_height)))
         return surfaceList
+
+    @classmethod
+    def clear_spritesheet_cache(cls) -> None:
+        with cls.spritesheet_lock:
+            cls.spritesheet_cache.clear()
+            cls.atlas.clear()
+        return None
@@ -0,0 +1,66 @@
+import os
+
+import pygame
+import pytest
+
+from benchmarks.synthetic_map import generate_map
+from src.components.map_cache import MapCache
+
+
+@pytest.fixture(scope='module', autouse=True)
+def display():
+    # The atlas is converted for the display, like when the game loads a map
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    yield
+    pygame.display.quit()
+
+
+@pytest.fixture
+def compiled(tmp_path):
+    map_path = generate_map(tmp_path / 'level.tmx', 16, 12)
+    cache_path = tmp_path / 'level.cmap'
+    MapCache.compile(map_path, cache_path)
+    return map_path, cache_path
+
+
+def count_hashes(monkeypatch) -> list:
+    calls = []
+    hash_files = MapCache.hash_files
+    def counted(paths):
+        calls.append(paths)
+        return hash_files(paths)
+    monkeypatch.setattr(MapCache, 'hash_files', counted)
+    return calls
+
+
+def recorded_mtime(cache_path) -> int:
+    meta, _ = MapCache.read_meta(cache_path.read_bytes())
+    return meta['sources'][0][1]
+
+
+def test_touched_source_records_new_mtime(compiled, monkeypatch):
+    map_path, cache_path = compiled
+    expected = MapCache.load(map_path, cache_path)
+    mtime = os.stat(map_path).st_mtime_ns + 10**9
+    os.utime(map_path, ns=(mtime, mtime))
+    hashes = count_hashes(monkeypatch)
+
+    touched = MapCache.load(map_path, cache_path)
+    assert touched is not None and len(hashes) == 1
+    assert recorded_mtime(cache_path) == mtime
+    # Back on the mtime fast path, with the same grids as before
+    again = MapCache.load(map_path, cache_path)
+    assert again is not None and len(hashes) == 1
+    for layer, expected_layer in zip(again.layers, expected.layers):
+        if hasattr(layer, 'data'):
+            assert layer.data == expected_layer.data
+
+
+def test_changed_source_is_stale(compiled):
+    map_path, cache_path = compiled
+    with open(map_path, 'a') as f:
+        f.write('\n<!-- edited -->\n')
+    assert MapCache.load(map_path, cache_path) is None
+    assert MapCache.load_or_compile(cache_path.parent, map_path) is not None
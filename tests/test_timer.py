@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from src.components.timer import Timer, TimerService
+
+
+def advance_or_fail(service: TimerService, ms: float) -> None:
+    # A timer re-entering itself would make advance spin forever, fail instead of hanging
+    worker = threading.Thread(target=service.advance, args=(ms,), daemon=True)
+    worker.start()
+    worker.join(timeout=2)
+    assert not worker.is_alive(), 'TimerService.advance did not return'
+
+
+def test_repeat_rejects_non_positive_duration():
+    service = TimerService()
+    for duration in (0, -5):
+        with pytest.raises(ValueError):
+            Timer(duration, repeat=True, service=service)
+    # One-shots may still expire on the next advance
+    Timer(0, service=service).activate()
+    advance_or_fail(service, 16)
+
+
+def test_repeat_fires_once_per_advance():
+    service = TimerService()
+    fired = []
+    Timer(1e-9, lambda: fired.append(service.time), repeat=True, service=service).activate()
+    advance_or_fail(service, 16)
+    advance_or_fail(service, 16)
+    assert fired == [16, 32]
+
+
+def test_repeat_keeps_its_period():
+    service = TimerService()
+    fired = []
+    Timer(10, lambda: fired.append(service.time), repeat=True, service=service).activate()
+    for _ in range(10):
+        advance_or_fail(service, 4)
+    assert fired == [12, 20, 32, 40]